@@ -0,0 +1,37 @@
+"""
+Mede o backfill ponta a ponta sem VictoriaMetrics, com MemorySink e FileSink.
+
+Uso (a partir da raiz do repositório):
+    PYTHONPATH=sim_core python -m benchmarks.bench_backfill [horizon_days]
+"""
+from __future__ import annotations
+import sys, tempfile, time
+
+import config as C
+from layers.generation.file_provider import FileDataProvider
+from layers.emission.victoria import DataEmitter
+from layers.emission.sinks import MemorySink, FileSink
+from pipelines.backfill_file import run_backfill_from_file
+
+def main(horizon_days: int = 30):
+    provider = FileDataProvider(
+        csv_path=C.CSV_PATH, date_col=C.DATE_COL, time_col=C.TIME_COL, inverter_cols=C.INVERTER_COLS,
+        poa_col=C.POA_COL, tcell_col=C.TCELL_COL, tmod_col=C.TMOD_COL, decimal=",", sep=",",
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, sink in (("memory", MemorySink()), ("file", FileSink(tmp))):
+            emitter = DataEmitter(sink=sink)
+            t0 = time.perf_counter()
+            run_backfill_from_file(
+                provider, emitter,
+                module_name=C.MODULE_NAME, modules_by_inverter=C.MODULES_BY_INVERTER, n_inverters=C.N_INVERTERS,
+                sunny_thr=C.SUNNY_GHI_THRESHOLD, day_thr=C.DAY_GHI_THRESHOLD, horizon_days=horizon_days,
+                derate=C.DERATE,
+            )
+            emitter.close()
+            dt = time.perf_counter() - t0
+            n = len(sink.lines) if isinstance(sink, MemorySink) else None
+            print(f"{name:7s} {horizon_days} dias: {dt:.2f} s" + (f" | {n} linhas ({n / dt:,.0f}/s)" if n else ""))
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 30)
@@ -0,0 +1,52 @@
+"""
+Compara o custo dos modelos de simulação (pvwatts x CEC single-diode x superfície interpolada).
+
+Uso (a partir da raiz do repositório):
+    PYTHONPATH=sim_core python -m benchmarks.bench_simulation [n_amostras]
+"""
+from __future__ import annotations
+import sys, time
+
+import numpy as np
+
+import config as C
+from layers.simulation.pv_funcs import simulate, simulate_batch, simulate_batch_parallel
+from layers.simulation.surface import PowerSurface
+
+def _timeit(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main(n: int = 100_000):
+    rng = np.random.default_rng(0)
+    poa = rng.uniform(0.0, 1200.0, n)
+    tcell = rng.uniform(10.0, 70.0, n)
+    simulate_batch(C.MODULE_NAME, poa[:10], tcell[:10], C.MODULES_BY_INVERTER)  # aquece o cache do CEC
+
+    results = {}
+    for model in ("pvwatts", "cec"):
+        t_tick = _timeit(lambda: simulate(C.MODULE_NAME, 800.0, 45.0, C.MODULES_BY_INVERTER, model=model), repeat=50)
+        t_batch = _timeit(lambda: simulate_batch(C.MODULE_NAME, poa, tcell, C.MODULES_BY_INVERTER, model=model))
+        results[model] = t_batch
+        print(f"{model:8s} tick: {t_tick * 1e6:9.1f} us | lote {n}: {t_batch * 1e3:9.1f} ms ({t_batch / n * 1e9:7.1f} ns/amostra)")
+
+    t_par = _timeit(lambda: simulate_batch_parallel(
+        C.MODULE_NAME, poa, tcell, C.MODULES_BY_INVERTER, model="cec", workers=4
+    ), repeat=1)
+    print(f"cec      pool 4 processos, lote {n}: {t_par * 1e3:9.1f} ms")
+    print(f"custo relativo cec/pvwatts (lote): {results['cec'] / results['pvwatts']:.1f}x")
+
+    t0 = time.perf_counter()
+    surf = PowerSurface(C.MODULE_NAME, C.MODULES_BY_INVERTER, model="cec")
+    t_build = time.perf_counter() - t0
+    t_tick = _timeit(lambda: surf(800.0, 45.0), repeat=50)
+    t_batch = _timeit(lambda: surf.evaluate(poa, tcell))
+    print(f"superfície cec {surf.grid_kw.shape}: construção {t_build * 1e3:.0f} ms | erro ≤ {surf.error_bound_kw:.3f} kW")
+    print(f"superfície tick: {t_tick * 1e6:9.1f} us | lote {n}: {t_batch * 1e3:9.1f} ms")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
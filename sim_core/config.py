@@ -7,16 +7,73 @@ POA_COL = "POA Irradiation 1"
 TCELL_COL = "PV Cell Temperature"
 TMOD_COL = "PV Module Temperature 1"
 DATE_COL = "Timestamp"
-TIME_COL = "Time"
+TIME_COL = "Time"          # None se DATE_COL já traz data e hora
+DATE_FORMAT = None         # ex.: "%m/%d/%Y %H:%M:%S" (data + " " + hora); None = ISO ou dia-primeiro
+
+# Passo de saída (s) do provider; None mantém a resolução da fonte (ex.: 1 s SCADA -> 900)
+OUTPUT_STEP_S = None
+RESAMPLE_MAX_GAP_S = None  # buraco máximo preenchido por interpolação (None = automático)
 
 MODULE_NAME = "Jinko_Solar_Co___Ltd_JKM320PP_72"
 MODULES_BY_INVERTER = 11340
 N_INVERTERS = 8
 DERATE = 0.8644
 
+# Topologia heterogênea opcional: um dict por inversor (chaves de InverterSpec).
+# Chaves ausentes usam MODULE_NAME / MODULES_BY_INVERTER / derate calibrado. Ex.:
+# TOPOLOGY = [{"modules": 11340}, {"module_name": "...", "modules": 10800, "poa_sensor": "POA Irradiation 2"}]
+TOPOLOGY = None
+SENSOR_COLS = []           # colunas extras de POA/Tcell referenciadas na topologia
+
+# Modelo de simulação: "pvwatts" (rápido) ou "cec" (single-diode + estágio de inversor)
+SIM_MODEL = "pvwatts"
+INVERTER_EFFICIENCY = 0.98
+INVERTER_PAC_MAX_KW = None
+SIM_WORKERS = 1
+# Superfície (POA, Tcell) pré-calculada com interpolação bilinear no lugar do modelo exato
+SIM_SURFACE = False
+SIM_SURFACE_TOL_KW = 0.5
+
 SUNNY_GHI_THRESHOLD = 400.0
 DAY_GHI_THRESHOLD   = 20.0
 
+# Estágio de qualidade de dados (range/stuck/spike/flatline) antes de calibração e alarmes
+QUALITY_CHECKS = True
+
 VM_URL = "http://localhost:8428/api/v1/import/prometheus"
 
+# Destino das métricas: "victoria" (HTTP), "file" (segmentos .gz p/ importação em lote) ou "memory"
+SINK = "victoria"
+SINK_DIR = "./export"
+SINK_FORMAT = "prom"       # "prom" ou "jsonl"
+SINK_FLUSH_S = 60          # "file": grava o buffer pelo menos a cada N s
+SINK_MEMORY_MAX_LINES = 1_000_000   # "memory" (testes): guarda só as últimas N linhas
+
 BACKFILL_HORIZON_DAYS = 3
+
+# Arquivo Parquet das saídas (plant/year/month); None desativa. Requer pyarrow.
+ARCHIVE_DIR = None
+PLANT_ID = "UFV_X"
+
+# Coordenadas da usina (obrigatórias para NIGHT_FAST_PATH) e fuso do relógio do CSV
+# (hora local rotulada como UTC)
+LATITUDE = None
+LONGITUDE = None
+CLOCK_UTC_OFFSET_H = -3
+# Caminho rápido noturno: tabela de nascer/pôr do sol; à noite só séries que mudam + heartbeat completo
+NIGHT_FAST_PATH = False
+NIGHT_HEARTBEAT_S = 3600
+NIGHT_PAC_KW = 0.05        # potência real (kW) acima disso à noite força tick completo
+SUN_CACHE_DIR = "./.cache"
+
+# Job de taxa de perda de desempenho (plr_job.py): período, paralelismo e frota.
+# PLR_PLANTS: lista de dicts (chaves de PlantSpec; "source" = kwargs do HistoryReader, que
+# mantém o epoch real dos dados; csv_path com "{year}" = um arquivo por ano); None = só a
+# usina deste config.
+PLR_START = "2016-01-01"
+PLR_END = None             # None = agora
+PLR_WORKERS = 4
+PLR_CHUNK_DAYS = 90
+PLR_POA_MIN = 200.0
+PLR_CI = 0.95              # nível de confiança dos ICs, igual para todos os métodos
+PLR_PLANTS = None
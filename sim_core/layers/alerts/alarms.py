@@ -23,6 +23,8 @@ class Observation:
     tmod_c: Optional[float]
     tcell_c: Optional[float]
     inverter_kw: List[float]
+    quality_ok: bool = True
+    inverter_ok: Optional[List[bool]] = None
 
 class Alarm:
     name: str
@@ -42,8 +44,16 @@ class Alarm:
         """Gancho para histerese/debounce simples (sobrescrever se quiser)."""
         return new_state
 
+    def hold(self, obs: Observation):
+        """Gancho chamado no lugar de evaluate quando o dado é reprovado (atualiza estado interno)."""
+
     def step(self, obs: Observation, emitter: AlertEmitterProtocol):
-        new_state = self.hysteresis(self.evaluate(obs))
+        if obs.quality_ok:
+            new_state = self.hysteresis(self.evaluate(obs))
+        else:
+            # dado reprovado no controle de qualidade: mantém o estado anterior
+            self.hold(obs)
+            new_state = self._state
         self._state = new_state
         if new_state != ALARM_OK:
             self._count += 1
@@ -85,7 +95,8 @@ class InverterOfflineAlarm(Alarm):
     def evaluate(self, obs: Observation) -> int:
         if obs.day_flag == 0 or obs.poa_wm2 < self.min_poa:
             return ALARM_OK
-        zeros = [i for i, kw in enumerate(obs.inverter_kw) if kw <= self.min_kw]
+        ok = obs.inverter_ok or [True] * len(obs.inverter_kw)
+        zeros = [i for i, kw in enumerate(obs.inverter_kw) if ok[i] and kw <= self.min_kw]
         if len(zeros) >= 2:
             self.labels["detail"] = f"{len(zeros)}_inverters_zero"
             return ALARM_CRIT
@@ -138,6 +149,10 @@ class RampIrradianceAlarm(Alarm):
         self.crit = dpoa_crit
         self._prev_poa: Optional[float] = None
 
+    def hold(self, obs: Observation):
+        # POA reprovada não serve de referência e a anterior fica velha: recomeça no próximo tick bom
+        self._prev_poa = None
+
     def evaluate(self, obs: Observation) -> int:
         if self._prev_poa is None:
             self._prev_poa = obs.poa_wm2
@@ -0,0 +1,282 @@
+from __future__ import annotations
+import warnings
+from statistics import NormalDist
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from layers.generation.file_provider import HistoryReader
+from layers.simulation.pv_funcs import retrieve_module_data, pvwatts_module_w
+from layers.quality.checks import QualityConfig, assess
+
+DAY_MS = 86_400_000
+CI_LEVEL = 0.95   # nível único dos ICs de yoy, regression e rolling (mesmas métricas plant_plr_ci_*)
+
+@dataclass
+class PlantSpec:
+    """Uma usina da frota: kwargs do HistoryReader + arranjo para o pvwatts de referência."""
+    plant: str
+    source: Dict[str, Any]
+    module_name: str
+    modules_by_inverter: int
+    n_inverters: int
+
+@dataclass
+class DailyIndex:
+    """Índice de desempenho diário corrigido por temperatura: Σ Pac / Σ P_pvwatts(POA, Tcell)."""
+    day_ms: np.ndarray
+    pi: np.ndarray
+    n_samples: np.ndarray
+
+    @classmethod
+    def concat(cls, parts: Sequence["DailyIndex"]) -> "DailyIndex":
+        if not parts:
+            return cls(np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64))
+        day = np.concatenate([p.day_ms for p in parts])
+        order = np.argsort(day, kind="stable")
+        return cls(day[order], np.concatenate([p.pi for p in parts])[order],
+                   np.concatenate([p.n_samples for p in parts])[order])
+
+@dataclass
+class LossRate:
+    """Taxa de perda de desempenho (%/ano; negativo = degradação) com intervalo de confiança CI_LEVEL."""
+    method: str
+    rate_pct_per_year: float
+    ci_low: float
+    ci_high: float
+    n: int
+
+@dataclass
+class RollingRate:
+    """Regressão em janela móvel; ts_ms = fim de cada janela."""
+    ts_ms: np.ndarray
+    rate_pct_per_year: np.ndarray
+    ci_low: np.ndarray
+    ci_high: np.ndarray
+
+@dataclass
+class PLRResult:
+    plant: str
+    daily: DailyIndex
+    yoy: LossRate
+    regression: LossRate
+    rolling: RollingRate = field(repr=False)
+    covered_ms: Tuple[int, int] = (0, 0)   # trecho da janela pedida que a fonte cobre
+    coverage: float = 1.0                  # fração da janela pedida coberta pela fonte
+
+# ---------------------------------------------------------------------------
+# Índice diário (streaming em blocos pelo provider)
+# ---------------------------------------------------------------------------
+
+def daily_performance_index(
+    provider: HistoryReader,
+    module_name: str,
+    modules_by_inverter: int,
+    n_inverters: int,
+    start_utc: datetime,
+    end_utc: datetime,
+    *,
+    chunk_days: int = 90,
+    poa_min: float = 200.0,
+    min_samples: int = 8,
+    quality: Optional[QualityConfig] = None,
+) -> DailyIndex:
+    """
+    Lê [start, end) em blocos de chunk_days e agrega por dia (relógio dos dados) só as amostras
+    com POA >= poa_min. Dias com menos de min_samples amostras válidas ficam de fora.
+    """
+    module = retrieve_module_data(module_name)
+    scale_kw = modules_by_inverter * n_inverters / 1000.0
+    parts = []
+    t = start_utc
+    while t < end_utc:
+        t_end = min(t + timedelta(days=chunk_days), end_utc)
+        a = provider.get_arrays_between(t, t_end - timedelta(seconds=1))
+        t = t_end
+        if not len(a["ts_ms"]):
+            continue
+        poa = np.asarray(a["poa_wm2"], dtype=float)
+        tcell = np.asarray(a["tcell_c"], dtype=float)
+        pac = np.asarray(a["inverters_kw"], dtype=float).reshape(len(poa), -1).sum(axis=1)
+        with np.errstate(invalid="ignore"):
+            keep = (poa >= poa_min) & np.isfinite(tcell) & np.isfinite(pac)
+        if quality is not None:
+            keep &= assess(a, quality).row_ok
+        if not keep.any():
+            continue
+        expected = scale_kw * pvwatts_module_w(module, poa[keep], tcell[keep])
+        day = a["ts_ms"][keep] // DAY_MS
+        d0 = int(day[0])
+        idx = day - d0
+        e_real = np.bincount(idx, weights=pac[keep])
+        e_ref = np.bincount(idx, weights=expected)
+        count = np.bincount(idx)
+        ok = (count >= min_samples) & (e_ref > 0)
+        days = np.flatnonzero(ok)
+        parts.append(DailyIndex((days + d0) * DAY_MS, e_real[ok] / e_ref[ok], count[ok]))
+    return DailyIndex.concat(parts)
+
+# ---------------------------------------------------------------------------
+# Taxas de perda
+# ---------------------------------------------------------------------------
+
+def yoy_rate(daily: DailyIndex, *, ci: float = CI_LEVEL, n_boot: int = 1000, seed: int = 0) -> LossRate:
+    """
+    Year-over-year: cada dia é comparado ao mesmo dia do calendário um ano depois; a taxa é a
+    mediana dos pares e o intervalo vem de bootstrap da mediana. Robusta a sazonalidade e sujeira.
+    """
+    day = daily.day_ms.astype("datetime64[ms]").astype("datetime64[D]")
+    month = day.astype("datetime64[M]")
+    nxt = (month + 12).astype("datetime64[D]") + (day - month.astype("datetime64[D]"))
+    j = np.searchsorted(day, nxt)
+    j_ok = np.minimum(j, len(day) - 1)
+    pair = (j < len(day)) & (day[j_ok] == nxt)
+    i, j = np.flatnonzero(pair), j[pair]
+    if not i.size:
+        return LossRate("yoy", np.nan, np.nan, np.nan, 0)
+    years = (day[j] - day[i]).astype(np.int64) / 365.25
+    rates = 100.0 * (daily.pi[j] / daily.pi[i] - 1.0) / years
+    rng = np.random.default_rng(seed)
+    boot = np.median(rates[rng.integers(0, rates.size, size=(n_boot, rates.size))], axis=1)
+    lo, hi = np.quantile(boot, [(1 - ci) / 2, (1 + ci) / 2])
+    return LossRate("yoy", float(np.median(rates)), float(lo), float(hi), int(rates.size))
+
+def _z(ci: float) -> float:
+    """Quantil normal bilateral do nível ci (0.95 -> 1.96)."""
+    return NormalDist().inv_cdf((1 + ci) / 2)
+
+def _ols_rate(x: np.ndarray, y: np.ndarray, z: float) -> Tuple[float, float, float]:
+    n = x.size
+    xm, ym = x.mean(), y.mean()
+    sxx = float(np.dot(x - xm, x - xm))
+    if n < 3 or sxx <= 0 or ym <= 0:
+        return np.nan, np.nan, np.nan
+    slope = float(np.dot(x - xm, y - ym)) / sxx
+    resid = y - ym - slope * (x - xm)
+    se = np.sqrt(float(np.dot(resid, resid)) / (n - 2) / sxx)
+    return float(100.0 * slope / ym), float(100.0 * (slope - z * se) / ym), float(100.0 * (slope + z * se) / ym)
+
+def regression_rate(daily: DailyIndex, *, ci: float = CI_LEVEL) -> LossRate:
+    """OLS do índice diário contra o tempo (anos); taxa relativa à média do índice, IC pelo erro padrão."""
+    x = (daily.day_ms - (daily.day_ms[0] if daily.day_ms.size else 0)) / (365.25 * DAY_MS)
+    rate, lo, hi = _ols_rate(x, daily.pi, _z(ci))
+    return LossRate("regression", rate, lo, hi, int(daily.pi.size))
+
+def rolling_rate(daily: DailyIndex, *, window_days: int = 365, step_days: int = 30, ci: float = CI_LEVEL,
+                 min_days: int = 90) -> RollingRate:
+    """
+    Regressão em janelas de window_days a cada step_days, por somas acumuladas numa grade diária
+    (dias ausentes pesam zero), sem laço por janela.
+    """
+    empty = RollingRate(*(np.zeros(0) for _ in range(4)))
+    z = _z(ci)
+    if not daily.day_ms.size:
+        return empty
+    d = daily.day_ms // DAY_MS
+    d0 = int(d[0])
+    n_grid = int(d[-1]) - d0 + 1
+    w = np.zeros(n_grid)
+    y = np.zeros(n_grid)
+    w[d - d0] = 1.0
+    y[d - d0] = daily.pi
+    x = np.arange(n_grid) / 365.25
+
+    def csum(v):
+        return np.concatenate(([0.0], np.cumsum(v)))
+    S = [csum(v) for v in (w, w * x, w * y, w * x * x, w * x * y, w * y * y)]
+    ends = np.arange(window_days, n_grid + 1, step_days)
+    if not ends.size:
+        return empty
+    n, sx, sy, sxx, sxy, syy = (s[ends] - s[ends - window_days] for s in S)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vxx = sxx - sx * sx / n
+        vxy = sxy - sx * sy / n
+        vyy = syy - sy * sy / n
+        slope = vxy / vxx
+        ym = sy / n
+        sse = np.maximum(vyy - slope * vxy, 0.0)
+        se = np.sqrt(sse / (n - 2) / vxx)
+        ok = (n >= min_days) & (vxx > 0) & (ym > 0)
+        rate = np.where(ok, 100.0 * slope / ym, np.nan)
+        lo = np.where(ok, 100.0 * (slope - z * se) / ym, np.nan)
+        hi = np.where(ok, 100.0 * (slope + z * se) / ym, np.nan)
+    ts = (d0 + ends - 1) * DAY_MS
+    return RollingRate(ts, rate, lo, hi)
+
+# ---------------------------------------------------------------------------
+# Job em lote: (usina, ano) em paralelo num pool de processos
+# ---------------------------------------------------------------------------
+
+def _year_job(args) -> Tuple[str, DailyIndex, Optional[Tuple[int, int]]]:
+    spec, year, start_utc, end_utc, kwargs = args
+    t0 = max(start_utc, datetime(year, 1, 1, tzinfo=timezone.utc))
+    t1 = min(end_utc, datetime(year + 1, 1, 1, tzinfo=timezone.utc))
+    # cada tarefa lê só o seu ano (em blocos): memória por worker ~ um ano de uma usina
+    reader = HistoryReader(**spec.source, start_utc=t0, end_utc=t1)
+    if reader.empty:
+        return spec.plant, DailyIndex.concat([]), None
+    first, last = reader.span
+    span_ms = (int(first.timestamp() * 1000), int(last.timestamp() * 1000) + reader.step_s * 1000)
+    daily = daily_performance_index(
+        reader, spec.module_name, spec.modules_by_inverter, spec.n_inverters, t0, t1, **kwargs
+    )
+    return spec.plant, daily, span_ms
+
+def run_plr(
+    plants: Sequence[PlantSpec],
+    start_utc: datetime,
+    end_utc: datetime,
+    *,
+    workers: int = 1,
+    chunk_days: int = 90,
+    poa_min: float = 200.0,
+    min_samples: int = 8,
+    quality: Optional[QualityConfig] = None,
+    window_days: int = 365,
+    step_days: int = 30,
+    ci: float = CI_LEVEL,
+) -> List[PLRResult]:
+    """
+    Índice diário por (usina, ano) em paralelo; os ajustes (baratos) rodam no processo principal.
+    Usinas cujo histórico não cruza a janela geram ValueError; cobertura parcial gera aviso.
+    """
+    kwargs = dict(chunk_days=chunk_days, poa_min=poa_min, min_samples=min_samples, quality=quality)
+    jobs = [(spec, y, start_utc, end_utc, kwargs) for spec in plants for y in range(start_utc.year, end_utc.year + 1)]
+    if workers <= 1:
+        done = [_year_job(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            done = list(ex.map(_year_job, jobs))
+    by_plant: Dict[str, List[DailyIndex]] = {spec.plant: [] for spec in plants}
+    spans: Dict[str, List[Tuple[int, int]]] = {spec.plant: [] for spec in plants}
+    for plant, daily, span_ms in done:
+        by_plant[plant].append(daily)
+        if span_ms is not None:
+            spans[plant].append(span_ms)
+    req0, req1 = int(start_utc.timestamp() * 1000), int(end_utc.timestamp() * 1000)
+    results = []
+    for plant, parts in by_plant.items():
+        if not spans[plant]:
+            raise ValueError(f"{plant}: histórico não cobre {start_utc:%Y-%m-%d} a {end_utc:%Y-%m-%d}.")
+        c0 = max(req0, min(s[0] for s in spans[plant]))
+        c1 = min(req1, max(s[1] for s in spans[plant]))
+        if c1 <= c0:
+            raise ValueError(f"{plant}: histórico não cobre {start_utc:%Y-%m-%d} a {end_utc:%Y-%m-%d}.")
+        # em dias inteiros: noites sem amostra nas pontas não contam como falta de cobertura
+        d0_ms, d1_ms = c0 // DAY_MS * DAY_MS, -(-c1 // DAY_MS) * DAY_MS
+        coverage = (min(req1, d1_ms) - max(req0, d0_ms)) / max(1, req1 - req0)
+        if coverage < 1.0:
+            d0 = datetime.fromtimestamp(c0 / 1000, tz=timezone.utc)
+            d1 = datetime.fromtimestamp(c1 / 1000, tz=timezone.utc)
+            warnings.warn(f"{plant}: histórico cobre só {100 * coverage:.0f}% da janela pedida "
+                          f"({d0:%Y-%m-%d} a {d1:%Y-%m-%d}).")
+        daily = DailyIndex.concat(parts)
+        results.append(PLRResult(
+            plant, daily, yoy_rate(daily, ci=ci), regression_rate(daily, ci=ci),
+            rolling_rate(daily, window_days=window_days, step_days=step_days, ci=ci),
+            covered_ms=(c0, c1), coverage=coverage,
+        ))
+    return results
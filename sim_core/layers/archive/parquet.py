@@ -0,0 +1,208 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+
+from layers.alerts.alarms import AlertEmitterProtocol
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.dataset as ds
+except ImportError:  # pragma: no cover - dependência opcional
+    pa = pq = ds = None
+
+def _schemas() -> Dict[str, "pa.Schema"]:
+    ts = pa.timestamp("ms", tz="UTC")
+    return {
+        "plant": pa.schema([
+            ("ts", ts), ("poa_wm2", pa.float32()), ("tcell_c", pa.float32()), ("tmod_c", pa.float32()),
+            ("pac_kw_total", pa.float32()), ("ideal_total_kw", pa.float32()), ("pr_inst", pa.float32()),
+            ("sunny_flag", pa.int8()), ("day_flag", pa.int8()), ("quality_ok", pa.int8()),
+            ("real_kwh_total", pa.float64()), ("ideal_kwh_total", pa.float64()),
+        ]),
+        "inverter": pa.schema([
+            ("ts", ts), ("inverter", pa.int16()), ("ideal_kw", pa.float32()), ("real_kw", pa.float32()),
+        ]),
+        "pr_daily": pa.schema([("ts", ts), ("pr_daily", pa.float32())]),
+        "alarm": pa.schema([("ts", ts), ("alarm", pa.string()), ("state", pa.int8()), ("count", pa.int64())]),
+    }
+
+class ParquetArchive:
+    """
+    Arquivo colunar das saídas do gêmeo, particionado em
+      <root>/<tabela>/plant=<plant>/year=YYYY/month=M/part-<sessão>-<seq>.parquet
+    Tabelas: plant (1 linha por passo), inverter (1 linha por passo x inversor), pr_daily, alarm.
+    As linhas ficam em buffer por tabela; cada flush (a cada row_group_rows linhas, a cada
+    flush_interval_s ou explícito) grava arquivos novos e já fechados (escrita em arquivo
+    temporário oculto + rename), então tudo que está em disco é legível, mesmo com o gêmeo
+    rodando ou após um kill.
+    Compactação: quando chega dado de um mês posterior (o mês anterior fechou) e no close(),
+    os part files de cada mês escrito são reescritos num único arquivo ordenado por ts.
+    """
+    def __init__(self, root: str, plant: str, row_group_rows: int = 100_000, compression: str = "zstd",
+                 flush_interval_s: Optional[float] = 3600.0):
+        if pa is None:
+            raise ImportError("ParquetArchive requer pyarrow (pip install pyarrow).")
+        self.root = root
+        self.plant = plant
+        self.row_group_rows = row_group_rows
+        self.compression = compression
+        self.flush_interval_s = flush_interval_s
+        self.schemas = _schemas()
+        self._session = time.strftime("%Y%m%dT%H%M%S") + f"-{os.getpid()}"
+        self._buf: Dict[str, Dict[str, List[np.ndarray]]] = {t: {} for t in self.schemas}
+        self._rows: Dict[str, int] = {t: 0 for t in self.schemas}
+        self._seq = 0
+        self._open_months: Dict[str, set] = {t: set() for t in self.schemas}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------ escrita
+    def _append(self, table: str, cols: Dict[str, Any]):
+        n = None
+        arrs = {}
+        for name, v in cols.items():
+            a = np.atleast_1d(np.asarray(v))
+            arrs[name] = a
+            n = len(a) if n is None else max(n, len(a))
+        if not n:
+            return
+        with self._lock:
+            buf = self._buf[table]
+            for name, a in arrs.items():
+                buf.setdefault(name, []).append(np.broadcast_to(a, (n,)) if len(a) == 1 and n > 1 else a)
+            self._rows[table] += n
+            if self._rows[table] >= self.row_group_rows:
+                self._flush_table(table)
+            elif (self.flush_interval_s is not None
+                  and time.monotonic() - self._last_flush >= self.flush_interval_s):
+                self._flush_all()
+
+    def append_plant(self, ts_ms, **cols):
+        """Colunas da tabela plant (escalares ou arrays do mesmo tamanho que ts_ms)."""
+        self._append("plant", {"ts": ts_ms, **cols})
+
+    def append_inverters(self, ts_ms, ideal_kw, real_kw):
+        """ideal_kw: (n,) ou (n, k); real_kw: (n, k). Gera n*k linhas em formato longo."""
+        real = np.asarray(real_kw, dtype=float)
+        real = real.reshape(np.atleast_1d(np.asarray(ts_ms)).size, -1)
+        n, k = real.shape
+        ideal = np.asarray(ideal_kw, dtype=float)
+        ideal = np.broadcast_to(ideal.reshape(n, -1) if ideal.size > 1 else ideal, (n, k))
+        self._append("inverter", {
+            "ts": np.repeat(np.atleast_1d(np.asarray(ts_ms)), k),
+            "inverter": np.tile(np.arange(k, dtype=np.int16), n),
+            "ideal_kw": ideal.ravel(),
+            "real_kw": real.ravel(),
+        })
+
+    def append_pr_daily(self, items: Sequence[tuple]):
+        if items:
+            ts, pr = zip(*items)
+            self._append("pr_daily", {"ts": list(ts), "pr_daily": list(pr)})
+
+    def append_alarm(self, ts_ms: int, name: str, state: int, count: int):
+        self._append("alarm", {"ts": ts_ms, "alarm": name, "state": state, "count": count})
+
+    def _flush_table(self, table: str):
+        if not self._rows[table]:
+            return
+        schema = self.schemas[table]
+        cols = {name: np.concatenate(parts) for name, parts in self._buf[table].items()}
+        self._buf[table] = {}
+        self._rows[table] = 0
+        ts = cols["ts"].astype("int64")
+        months = ts.astype("datetime64[ms]").astype("datetime64[M]").astype(np.int64)
+        for m in np.unique(months):
+            sel = months == m
+            arrays = []
+            for f in schema:
+                if f.name in cols:
+                    arrays.append(pa.array(cols[f.name][sel], type=f.type, from_pandas=True))
+                else:
+                    arrays.append(pa.nulls(int(sel.sum()), type=f.type))
+            self._write_file(table, int(m), pa.Table.from_arrays(arrays, schema=schema))
+        newest = int(months.max())
+        closed = [m for m in self._open_months[table] if m < newest]
+        for m in closed:
+            self._compact(table, m)
+        self._open_months[table].difference_update(closed)
+        self._open_months[table].update(int(m) for m in np.unique(months))
+
+    def _month_dir(self, table: str, month_idx: int) -> str:
+        year, month = 1970 + month_idx // 12, month_idx % 12 + 1
+        return os.path.join(self.root, table, f"plant={self.plant}", f"year={year}", f"month={month}")
+
+    def _compact(self, table: str, month_idx: int):
+        """Reescreve os part files de um mês num arquivo só (temporário + rename, depois remove os antigos)."""
+        d = self._month_dir(table, month_idx)
+        parts = sorted(os.path.join(d, f) for f in os.listdir(d)
+                       if f.startswith("part-") and f.endswith(".parquet")) if os.path.isdir(d) else []
+        if len(parts) < 2:
+            return
+        schema = self.schemas[table]
+        data = pa.concat_tables([pq.ParquetFile(p).read().cast(schema) for p in parts])
+        keys = [("ts", "ascending")] + ([("inverter", "ascending")] if table == "inverter" else [])
+        self._write_file(table, month_idx, data.sort_by(keys))
+        for p in parts:
+            os.remove(p)
+
+    def _write_file(self, table: str, month_idx: int, data: "pa.Table"):
+        d = self._month_dir(table, month_idx)
+        os.makedirs(d, exist_ok=True)
+        name = f"part-{self._session}-{self._seq:06d}.parquet"
+        self._seq += 1
+        # "." no início: o dataset ignora o arquivo até o rename atômico
+        tmp = os.path.join(d, "." + name + ".tmp")
+        pq.write_table(data, tmp, compression=self.compression, row_group_size=self.row_group_rows)
+        os.replace(tmp, os.path.join(d, name))
+
+    def _flush_all(self):
+        for table in self.schemas:
+            self._flush_table(table)
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush_all()
+
+    def close(self):
+        """Grava o que falta e compacta os meses escritos nesta sessão."""
+        with self._lock:
+            self._flush_all()
+            for table, months in self._open_months.items():
+                for m in sorted(months):
+                    self._compact(table, m)
+                months.clear()
+
+    def alert_emitter(self, inner: AlertEmitterProtocol) -> "ArchiveAlertEmitter":
+        return ArchiveAlertEmitter(inner, self)
+
+    # ------------------------------------------------------------------ leitura
+    @staticmethod
+    def read(root: str, table: str, columns: Optional[List[str]] = None, filter=None):
+        """Lê uma tabela como DataFrame (partições plant/year/month viram colunas; use filter p/ poda)."""
+        if ds is None:
+            raise ImportError("ParquetArchive requer pyarrow (pip install pyarrow).")
+        dataset = ds.dataset(os.path.join(root, table), format="parquet", partitioning="hive")
+        return dataset.to_table(columns=columns, filter=filter).to_pandas()
+
+class ArchiveAlertEmitter(AlertEmitterProtocol):
+    """Repassa alertas ao emissor original e arquiva estado + contagem na tabela alarm."""
+    def __init__(self, inner: AlertEmitterProtocol, archive: ParquetArchive):
+        self.inner = inner
+        self.archive = archive
+        self._state: Dict[tuple, int] = {}
+
+    def emit_alert_point(self, ts_ms: int, name: str, state: int, labels: Dict[str, str] | None = None):
+        self.inner.emit_alert_point(ts_ms, name, state, labels)
+        self._state[(ts_ms, name)] = int(state)
+
+    def emit_alert_count(self, ts_ms: int, name: str, count: int, labels: Dict[str, str] | None = None):
+        self.inner.emit_alert_count(ts_ms, name, count, labels)
+        state = self._state.pop((ts_ms, name), 0)
+        self.archive.append_alarm(ts_ms, name, state, int(count))
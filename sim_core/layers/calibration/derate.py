@@ -1,19 +1,13 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Tuple, Literal, Dict
+from typing import Tuple, Literal, Dict, Optional
 from datetime import datetime, timedelta, timezone
 
 import numpy as np
-import pvlib
 
 from layers.generation.file_provider import FileDataProvider
-from layers.simulation.pv_funcs import retrieve_module_data
-
-def _pvwatts_dc_vectorized(poa_wm2: np.ndarray, tcell_c: np.ndarray, module: dict) -> np.ndarray:
-    gamma_pdc = float(module["gamma_r"]) / 100.0
-    stc_w = float(module["STC"])
-    pdc = pvlib.pvsystem.pvwatts_dc(poa_wm2, tcell_c, stc_w, gamma_pdc, temp_ref=25.0)
-    return np.asarray(pdc, dtype=float)
+from layers.simulation.pv_funcs import simulate_batch_parallel
+from layers.quality.checks import QualityConfig, assess
 
 def _ols_closed_form(y: np.ndarray, pac: np.ndarray) -> float:
     y2 = float(np.dot(y, y))
@@ -62,26 +56,41 @@ class DerateCalibrator:
     method: Literal["ols", "huber", "both"] = "both"
     dmin: float = 0.5
     dmax: float = 1.3
+    model: Literal["pvwatts", "cec"] = "pvwatts"
+    inverter_eff: float = 0.98
+    inverter_pac_max_kw: Optional[float] = None
+    workers: int = 1
+    quality: Optional[QualityConfig] = None
 
     def _load_window(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
         start = now - timedelta(days=self.days)
-        series = self.provider.get_series_between(start, now)
-        poa, tcell, pac = [], [], []
-        for p in series:
-            if p["poa_wm2"] > self.day_thr:
-                poa.append(p["poa_wm2"])
-                tcell.append(p["tcell_c"])
-                pac.append(float(sum(p["inverters_kw"])))
-        if not poa:
+        a = self.provider.get_arrays_between(start, now)
+        poa = np.asarray(a["poa_wm2"], dtype=float)
+        tcell = np.asarray(a["tcell_c"], dtype=float)
+        pac = np.asarray(a["inverters_kw"], dtype=float).reshape(len(poa), -1).sum(axis=1)
+        with np.errstate(invalid="ignore"):
+            keep = (poa > self.day_thr) & np.isfinite(tcell) & np.isfinite(pac)
+        if self.quality is not None:
+            keep &= assess(a, self.quality).row_ok
+        if not keep.any():
             raise RuntimeError("Sem amostras acima de day_thr no intervalo escolhido para calibrar.")
-        return np.array(poa, dtype=float), np.array(tcell, dtype=float), np.array(pac, dtype=float)
+        return poa[keep], tcell[keep], pac[keep]
 
     def estimate(self) -> tuple[float, dict]:
         poa, tcell, pac_kw = self._load_window()
-        module = retrieve_module_data(self.module_name)
-        pdc_w_per_module = _pvwatts_dc_vectorized(poa, tcell, module)
-        per_inv_kw_no_derate = (self.modules_by_inverter * pdc_w_per_module) / 1000.0
+        if self.model == "cec" and self.inverter_pac_max_kw is not None:
+            # o clipping vem depois do derate em simulate_batch: ajusta só a parte linear (AC sem
+            # clipping) e descarta amostras medidas já no limite do inversor
+            keep = pac_kw < 0.99 * self.inverter_pac_max_kw * self.n_inverters
+            if not keep.any():
+                raise RuntimeError("Todas as amostras estão no limite de clipping do inversor.")
+            poa, tcell, pac_kw = poa[keep], tcell[keep], pac_kw[keep]
+        per_inv_kw_no_derate = simulate_batch_parallel(
+            self.module_name, poa, tcell, self.modules_by_inverter,
+            derate=1.0, model=self.model, inverter_eff=self.inverter_eff,
+            inverter_pac_max_kw=None, workers=self.workers,
+        )
         y_base_kw = per_inv_kw_no_derate * self.n_inverters
 
         d_ols = _ols_closed_form(y_base_kw, pac_kw)
@@ -0,0 +1,156 @@
+from __future__ import annotations
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Literal, Optional
+
+import requests
+
+class Sink:
+    """Destino de linhas no formato Prometheus text ("metric{labels} value ts_ms\\n")."""
+    def write(self, payload: str): ...
+    def flush(self): ...
+    def close(self):
+        self.flush()
+
+class VictoriaSink(Sink):
+    """POST direto no endpoint /api/v1/import/prometheus do VictoriaMetrics."""
+    def __init__(self, vm_url: str, timeout: float = 10):
+        self.vm_url = vm_url
+        self.timeout = timeout
+
+    def write(self, payload: str):
+        headers = {"Content-Type": "text/plain"}
+        resp = requests.post(self.vm_url, data=payload.encode("utf-8"), headers=headers, timeout=self.timeout)
+        resp.raise_for_status()
+
+class MemorySink(Sink):
+    """
+    Guarda as linhas em memória (testes e benchmarks, sem Docker). Num serviço de longa
+    duração use max_lines: só as últimas max_lines linhas ficam guardadas.
+    """
+    def __init__(self, max_lines: Optional[int] = None):
+        self.lines: deque = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+
+    def write(self, payload: str):
+        with self._lock:
+            self.lines.extend(payload.splitlines())
+
+    def clear(self):
+        with self._lock:
+            self.lines.clear()
+
+    def metric(self, name: str) -> List[str]:
+        return [l for l in self.lines if l.startswith(name + "{") or l.startswith(name + " ")]
+
+_LINE_RE = re.compile(r'^([^{\s]+)(?:\{(.*)\})?\s+(\S+)\s+(\d+)$')
+_LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+def line_to_json(line: str) -> Dict:
+    """Converte uma linha Prometheus no formato JSON-line de /api/v1/import do VictoriaMetrics."""
+    m = _LINE_RE.match(line)
+    if m is None:
+        raise ValueError(f"Linha inválida: {line!r}")
+    name, labels, value, ts = m.groups()
+    metric = {"__name__": name}
+    if labels:
+        metric.update(_LABEL_RE.findall(labels))
+    return {"metric": metric, "values": [float(value)], "timestamps": [int(ts)]}
+
+class FileSink(Sink):
+    """
+    Grava segmentos comprimidos particionados no tempo para importação em lote posterior:
+      <dir>/<prefix>-YYYYMMDD.prom.gz   (fmt="prom",  POST em /api/v1/import/prometheus)
+      <dir>/<prefix>-YYYYMMDD.jsonl.gz  (fmt="jsonl", POST em /api/v1/import)
+    As linhas ficam em buffer e são anexadas (membros gzip) a cada buffer_lines, a cada
+    flush_interval_s (tempo real grava pouco por tick) ou quando chega uma partição nova.
+    """
+    def __init__(self, directory: str, fmt: Literal["prom", "jsonl"] = "prom", partition_s: int = 86400,
+                 prefix: str = "pv", buffer_lines: int = 200_000, compresslevel: int = 6,
+                 flush_interval_s: Optional[float] = 60.0):
+        self.directory = directory
+        self.fmt = fmt
+        self.partition_s = partition_s
+        self.prefix = prefix
+        self.buffer_lines = buffer_lines
+        self.compresslevel = compresslevel
+        self.flush_interval_s = flush_interval_s
+        self._buf: Dict[int, List[str]] = {}
+        self._n = 0
+        self._max_part: Optional[int] = None
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, part: int) -> str:
+        day = datetime.fromtimestamp(part * self.partition_s, tz=timezone.utc)
+        stamp = day.strftime("%Y%m%d" if self.partition_s >= 86400 else "%Y%m%d%H%M")
+        return os.path.join(self.directory, f"{self.prefix}-{stamp}.{self.fmt}.gz")
+
+    def write(self, payload: str):
+        with self._lock:
+            closed = False
+            for line in payload.splitlines():
+                if not line:
+                    continue
+                ts_ms = int(line.rsplit(" ", 1)[1])
+                part = ts_ms // 1000 // self.partition_s
+                if self._max_part is None or part > self._max_part:
+                    # partição nova: as anteriores não recebem mais linhas em tempo real
+                    closed = self._max_part is not None
+                    self._max_part = part
+                self._buf.setdefault(part, []).append(line)
+                self._n += 1
+            due = (self.flush_interval_s is not None
+                   and time.monotonic() - self._last_flush >= self.flush_interval_s)
+            if self._n >= self.buffer_lines or closed or due:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        for part, lines in self._buf.items():
+            if self.fmt == "jsonl":
+                text = "".join(json.dumps(line_to_json(l), separators=(",", ":")) + "\n" for l in lines)
+            else:
+                text = "\n".join(lines) + "\n"
+            with gzip.open(self._path(part), "ab", compresslevel=self.compresslevel) as fh:
+                fh.write(text.encode("utf-8"))
+        self._buf.clear()
+        self._n = 0
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+def make_sink(cfg) -> Sink:
+    """Sink a partir de um módulo/objeto de configuração (SINK, SINK_DIR, SINK_FORMAT, ...)."""
+    kind = getattr(cfg, "SINK", "victoria")
+    if kind == "file":
+        return FileSink(getattr(cfg, "SINK_DIR", "./export"), fmt=getattr(cfg, "SINK_FORMAT", "prom"),
+                        flush_interval_s=getattr(cfg, "SINK_FLUSH_S", 60.0))
+    if kind == "memory":
+        return MemorySink(max_lines=getattr(cfg, "SINK_MEMORY_MAX_LINES", 1_000_000))
+    return VictoriaSink(cfg.VM_URL)
+
+def bulk_import(directory: str, vm_base_url: str, timeout: float = 600) -> int:
+    """Importa todos os segmentos de um FileSink no VictoriaMetrics, um POST gzip por arquivo."""
+    n = 0
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".prom.gz"):
+            endpoint = "/api/v1/import/prometheus"
+        elif name.endswith(".jsonl.gz"):
+            endpoint = "/api/v1/import"
+        else:
+            continue
+        with open(os.path.join(directory, name), "rb") as fh:
+            resp = requests.post(vm_base_url.rstrip("/") + endpoint, data=fh,
+                                 headers={"Content-Encoding": "gzip"}, timeout=timeout)
+        resp.raise_for_status()
+        n += 1
+    return n
@@ -1,9 +1,16 @@
 from __future__ import annotations
-import requests
+from typing import Optional
+
+from layers.emission.sinks import Sink, VictoriaSink
 
 class DataEmitter:
-    def __init__(self, vm_url: str):
+    def __init__(self, vm_url: Optional[str] = None, sink: Optional[Sink] = None):
+        if sink is None:
+            if vm_url is None:
+                raise ValueError("Informe vm_url ou um sink.")
+            sink = VictoriaSink(vm_url)
         self.vm_url = vm_url
+        self.sink = sink
 
     @staticmethod
     def _line(metric, labels, value, ts_ms):
@@ -11,9 +18,13 @@ class DataEmitter:
         return f"{metric}{labels_str} {value} {ts_ms}\n"
 
     def _post_lines(self, payload: str):
-        headers = {"Content-Type": "text/plain"}
-        resp = requests.post(self.vm_url, data=payload.encode("utf-8"), headers=headers, timeout=10)
-        resp.raise_for_status()
+        self.sink.write(payload)
+
+    def flush(self):
+        self.sink.flush()
+
+    def close(self):
+        self.sink.close()
 
     def emit_poa(self, points, source_label='source="file"'):
         if not points:
@@ -24,9 +35,12 @@ class DataEmitter:
         self._post_lines("".join(lines))
 
     def emit_pv_inverters(self, ts_ms, ideal_per_inv_kw, real_per_inv_kw):
+        """ideal_per_inv_kw: um valor para todos os inversores ou uma sequência (topologia heterogênea)."""
         lines = []
+        if isinstance(ideal_per_inv_kw, (int, float)):
+            ideal_per_inv_kw = [ideal_per_inv_kw] * len(real_per_inv_kw)
         for i, real_kw in enumerate(real_per_inv_kw):
-            lines.append(self._line("pv_ideal_kw", f'inverter="{i}"', round(float(ideal_per_inv_kw), 3), ts_ms))
+            lines.append(self._line("pv_ideal_kw", f'inverter="{i}"', round(float(ideal_per_inv_kw[i]), 3), ts_ms))
             lines.append(self._line("pv_real_kw",  f'inverter="{i}"', round(float(real_kw), 3), ts_ms))
         self._post_lines("".join(lines))
 
@@ -66,11 +80,56 @@ class DataEmitter:
         lines.append(self._line("model_accuracy_pct", "", round(acc_pct, 4), ts_ms))
         self._post_lines("".join(lines))
 
+    def emit_quality(self, ts_ms, flags, ok):
+        """flags: {check: nº de canais sinalizados} do estágio de qualidade de dados."""
+        self._post_lines(self._quality_lines(ts_ms, flags, ok))
+
+    def emit_quality_bulk(self, items):
+        if not items:
+            return
+        self._post_lines("".join(self._quality_lines(ts_ms, flags, ok) for ts_ms, flags, ok in items))
+
+    def _quality_lines(self, ts_ms, flags, ok):
+        lines = [self._line("data_quality_flags", f'check="{c}"', int(n), ts_ms) for c, n in flags.items()]
+        lines.append(self._line("data_quality_ok", "", int(bool(ok)), ts_ms))
+        return "".join(lines)
+
+    def emit_performance_index_bulk(self, plant, items):
+        """items: [(dia_ms, índice)] do job de taxa de perda (PLR)."""
+        if not items:
+            return
+        labels = f'plant="{plant}"'
+        self._post_lines("".join(self._line("plant_performance_index", labels, round(float(pi), 5), ts)
+                                 for ts, pi in items))
+
+    def emit_loss_rate(self, plant, ts_ms, method, rate, ci_low, ci_high, n):
+        labels = f'plant="{plant}",method="{method}"'
+        lines = []
+        for metric, value in (("plant_plr_pct_per_year", rate), ("plant_plr_ci_low_pct_per_year", ci_low),
+                              ("plant_plr_ci_high_pct_per_year", ci_high)):
+            if value == value:  # NaN = sem dados suficientes
+                lines.append(self._line(metric, labels, round(float(value), 4), ts_ms))
+        lines.append(self._line("plant_plr_samples", labels, int(n), ts_ms))
+        self._post_lines("".join(lines))
+
+    def emit_loss_rate_rolling(self, plant, items):
+        """items: [(fim_da_janela_ms, taxa, ic_inf, ic_sup)] da regressão em janela móvel."""
+        labels = f'plant="{plant}",method="rolling"'
+        lines = []
+        for ts_ms, rate, lo, hi in items:
+            if rate != rate:
+                continue
+            lines.append(self._line("plant_plr_pct_per_year", labels, round(float(rate), 4), ts_ms))
+            lines.append(self._line("plant_plr_ci_low_pct_per_year", labels, round(float(lo), 4), ts_ms))
+            lines.append(self._line("plant_plr_ci_high_pct_per_year", labels, round(float(hi), 4), ts_ms))
+        if lines:
+            self._post_lines("".join(lines))
+
     def emit_alert_raw_lines(self, payload: str):
         """Permite postar linhas já formatadas (Prometheus line protocol) para alertas."""
         self._post_lines(payload)
 
     def make_alert_emitter(self):
-        """Cria um adaptador que publica alertas via _post_lines."""
+        """Cria um adaptador que publica alertas via _post_lines (mesmo sink dos dados)."""
         from layers.alerts.alarms import AlertEmitter
         return AlertEmitter(self._post_lines)
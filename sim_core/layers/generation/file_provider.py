@@ -1,91 +1,263 @@
 from __future__ import annotations
+import os
+import re
 from dataclasses import dataclass
-from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from layers.generation.resample import resample
+
+_ISO_DATE = re.compile(r"^\s*\d{4}-\d{2}-\d{2}")
+
+def _replay_keys(epoch_s: np.ndarray) -> np.ndarray:
+    """Chave inteira (mês, dia, segundo do dia) para reproduzir o ano de origem em qualquer ano."""
+    epoch_s = np.asarray(epoch_s, dtype=np.int64)
+    dt = epoch_s.astype("datetime64[s]")
+    month = dt.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    day = (dt.astype("datetime64[D]") - dt.astype("datetime64[M]")).astype(np.int64) + 1
+    sod = epoch_s % 86400
+    return (month * 32 + day) * 86400 + sod
 
 @dataclass
 class FileDataProvider:
     csv_path: str
     date_col: str
-    time_col: str
+    time_col: Optional[str]
     inverter_cols: List[str]
     poa_col: str
     tcell_col: str
     decimal: str = ","
     sep: str = ","
     tmod_col: Optional[str] = None
+    out_step_s: Optional[int] = None
+    max_gap_s: Optional[float] = None
+    sensor_cols: Optional[List[str]] = None   # sensores extras (POA/Tcell por inversor na topologia)
+    date_format: Optional[str] = None         # formato strptime de data[+hora]; None = ISO ou dia-primeiro
 
     def __post_init__(self):
-        self.df = pd.read_csv(self.csv_path, sep=self.sep, decimal=self.decimal, engine="python")
-        self.df["__src_dt"] = pd.to_datetime(
-            self.df[self.date_col].astype(str) + " " + self.df[self.time_col].astype(str),
-            dayfirst=True, errors="coerce"
-        )
-        self.df["__src_dt"] = self.df["__src_dt"].dt.tz_localize("UTC")
-        self.df["__key"] = self.df["__src_dt"].dt.strftime("%m-%d %H:%M")
-        self._keys_set = set(self.df["__key"].dropna().unique())
-        self.step_minutes = self._infer_step_minutes()
-
-    def _infer_step_minutes(self) -> int:
-        s = self.df["__src_dt"].dropna().sort_values().unique()
-        if len(s) >= 2:
-            dt0 = pd.Timestamp(s[0]).to_pydatetime()
-            for i in range(1, min(10, len(s))):
-                dt1 = pd.Timestamp(s[i]).to_pydatetime()
-                delta = int((dt1 - dt0).total_seconds() // 60)
-                if delta > 0:
-                    return delta
-        return 15
-
-    def _map_target_to_src_key(self, dt_target: datetime) -> Optional[str]:
-        key = dt_target.strftime("%m-%d %H:%M")
-        return key if key in self._keys_set else None
+        self.df = self._read_frame()
+        self.df = self.df.dropna(subset=["__src_dt"]).sort_values("__src_dt", kind="stable")
+
+        epoch_s = ((self.df["__src_dt"] - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+        cols = self._value_cols()
+        values = self.df[cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        src_step_s = self._infer_step_s(epoch_s)
+
+        if self.out_step_s and int(self.out_step_s) != src_step_s:
+            rs = resample(epoch_s, values, int(self.out_step_s), max_gap_s=self.max_gap_s, src_step_s=src_step_s)
+            # janelas sem cobertura (buraco > max_gap) saem inteiras: _lookup as trata como linha ausente
+            keep = ~np.isnan(rs.mean).all(axis=1)
+            epoch_s, values = rs.ts_s[keep], rs.mean[keep]
+            self.step_s = int(self.out_step_s)
+        else:
+            self.step_s = src_step_s
+        self._load_arrays(epoch_s, values)
+
+    def _value_cols(self) -> List[str]:
+        return ([self.poa_col, self.tcell_col] + ([self.tmod_col] if self.tmod_col else [])
+                + list(self.sensor_cols or []) + list(self.inverter_cols))
+
+    def _read_frame(self) -> pd.DataFrame:
+        """CSV inteiro com a coluna __src_dt (UTC, relógio dos dados)."""
+        df = pd.read_csv(self.csv_path, sep=self.sep, decimal=self.decimal)
+        df["__src_dt"] = self._parse_stamps(df)
+        return df
+
+    def _parse_stamps(self, df: pd.DataFrame) -> pd.Series:
+        """Instante UTC de cada linha; NaT onde a data/hora não interpreta."""
+        if self.date_format:
+            stamp = df[self.date_col].astype(str)
+            if self.time_col:
+                stamp = stamp + " " + df[self.time_col].astype(str)
+            return pd.to_datetime(stamp, format=self.date_format, errors="coerce").dt.tz_localize("UTC")
+        # caminho rápido: datas e horas se repetem (uma data por dia, uma hora por dia do ano),
+        # então cada valor distinto é interpretado uma vez só, com formato fixo
+        codes, uniq = pd.factorize(df[self.date_col].astype(str))
+        first = next((u for u in uniq if u.strip()), None)
+        fmt = None
+        if first is not None:
+            fmt = "ISO8601" if _ISO_DATE.match(first) else guess_datetime_format(first, dayfirst=True)
+        if fmt is None:
+            stamp = df[self.date_col].astype(str)
+            if self.time_col:
+                stamp = stamp + " " + df[self.time_col].astype(str)
+            return pd.to_datetime(stamp, dayfirst=True, errors="coerce").dt.tz_localize("UTC")
+        days = pd.to_datetime(pd.Series(uniq), format=fmt, errors="coerce", utc=True).to_numpy()
+        out = pd.Series(days[codes], index=df.index)
+        if self.time_col:
+            tcodes, tuniq = pd.factorize(df[self.time_col].astype(str))
+            hms = pd.Series(tuniq).str.strip()
+            hms = hms.where(hms.str.count(":") != 1, hms + ":00")
+            tod = pd.to_timedelta(hms, errors="coerce").to_numpy()
+            out = out + pd.Series(tod[tcodes], index=df.index)
+        return out
+
+    @staticmethod
+    def _infer_step_s(epoch_s: np.ndarray) -> int:
+        d = np.diff(np.unique(epoch_s))
+        if d.size:
+            return int(np.median(d))
+        return 900
+
+    @staticmethod
+    def _keys(epoch_s: np.ndarray) -> np.ndarray:
+        """Chave de indexação das linhas: replay do ano de origem (ver HistoryReader)."""
+        return _replay_keys(epoch_s)
+
+    def _load_arrays(self, epoch_s: np.ndarray, values: np.ndarray):
+        keys = self._keys(epoch_s)
+        keys, first = np.unique(keys, return_index=True)
+        values = values[first]
+        self._row_keys = keys
+        self._epoch_s = epoch_s[first]
+        self._poa = values[:, 0]
+        self._tcell = values[:, 1]
+        off = 2
+        self._tmod = values[:, off] if self.tmod_col else None
+        off += 1 if self.tmod_col else 0
+        self._sensors = {c: values[:, off + j] for j, c in enumerate(self.sensor_cols or [])}
+        off += len(self._sensors)
+        self._inv = values[:, off:]
+
+    @property
+    def step_minutes(self) -> float:
+        return self.step_s / 60.0
+
+    def _align(self, epoch_s: int) -> int:
+        return (epoch_s // self.step_s) * self.step_s
+
+    def _lookup(self, target_s: np.ndarray) -> np.ndarray:
+        """Índice da linha de origem para cada epoch alvo, ou -1 se ausente."""
+        keys = self._keys(target_s)
+        idx = np.searchsorted(self._row_keys, keys)
+        idx = np.minimum(idx, len(self._row_keys) - 1)
+        found = self._row_keys[idx] == keys if len(self._row_keys) else np.zeros(len(keys), dtype=bool)
+        return np.where(found, idx, -1)
 
     def get_point_now(self, now_utc: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
         if now_utc is None:
-            now_utc = datetime.now(timezone.utc).replace(second=0, microsecond=0)
-        step_s = self.step_minutes * 60
-        epoch = int(now_utc.timestamp())
-        aligned = datetime.fromtimestamp((epoch // step_s) * step_s, tz=timezone.utc)
-
-        key = self._map_target_to_src_key(aligned)
-        if key is None:
+            now_utc = datetime.now(timezone.utc).replace(microsecond=0)
+        aligned = self._align(int(now_utc.timestamp()))
+        i = int(self._lookup(np.array([aligned]))[0])
+        if i < 0:
             return None
+        return self._row_to_payload(i, aligned)
 
-        row = self.df[self.df["__key"] == key].iloc[0]
-        return self._row_to_payload(row, target_ts=aligned)
-
-    def get_series_between(self, start_utc: datetime, end_utc: datetime) -> List[Dict[str, Any]]:
+    def get_arrays_between(self, start_utc: datetime, end_utc: datetime) -> Dict[str, Any]:
+        """Mesma janela de get_series_between, em arrays NumPy (colunas) para os estágios vetorizados."""
         if end_utc < start_utc:
             start_utc, end_utc = end_utc, start_utc
+        t0 = self._align(int(start_utc.timestamp()))
+        targets = np.arange(t0, int(end_utc.timestamp()) + 1, self.step_s, dtype=np.int64)
+        idx = self._lookup(targets)
+        ok = idx >= 0
+        targets, idx = targets[ok], idx[ok]
+        return {
+            "ts_ms": targets * 1000,
+            "poa_wm2": self._poa[idx],
+            "tcell_c": self._tcell[idx],
+            "tmod_c": self._tmod[idx] if self._tmod is not None else None,
+            "inverters_kw": self._inv[idx],
+            "sensors": {c: v[idx] for c, v in self._sensors.items()},
+            "step_s": self.step_s,
+        }
 
-        out: List[Dict[str, Any]] = []
-        step = timedelta(minutes=self.step_minutes)
-        t = start_utc.replace(second=0, microsecond=0)
-        step_s = self.step_minutes * 60
-        epoch = int(t.timestamp())
-        t = datetime.fromtimestamp((epoch // step_s) * step_s, tz=timezone.utc)
-
-        while t <= end_utc:
-            key = self._map_target_to_src_key(t)
-            if key is not None:
-                row = self.df[self.df["__key"] == key].iloc[0]
-                out.append(self._row_to_payload(row, target_ts=t))
-            t += step
+    def get_series_between(self, start_utc: datetime, end_utc: datetime) -> List[Dict[str, Any]]:
+        a = self.get_arrays_between(start_utc, end_utc)
+        n = len(a["ts_ms"])
+        tmod = a["tmod_c"].tolist() if a["tmod_c"] is not None else [None] * n
+        out = [
+            {
+                "ts_ms": int(ts_ms),
+                "poa_wm2": poa,
+                "tcell_c": tcell,
+                "tmod_c": tm,
+                "inverters_kw": inv,
+                "step_s": self.step_s,
+            }
+            for ts_ms, poa, tcell, tm, inv in zip(
+                a["ts_ms"].tolist(), a["poa_wm2"].tolist(), a["tcell_c"].tolist(), tmod, a["inverters_kw"].tolist()
+            )
+        ]
+        if a["sensors"]:
+            cols = {c: v.tolist() for c, v in a["sensors"].items()}
+            for i, p in enumerate(out):
+                p["sensors"] = {c: v[i] for c, v in cols.items()}
         return out
 
-    def _row_to_payload(self, row: pd.Series, target_ts: datetime) -> Dict[str, Any]:
-        ts_ms = int(target_ts.timestamp() * 1000)
-        poa = float(row[self.poa_col])
-        tcell = float(row[self.tcell_col])
-        tmod = float(row[self.tmod_col]) if self.tmod_col else None
-        inv = [float(row[c]) for c in self.inverter_cols]
-        return {
-            "ts_ms": ts_ms,
-            "poa_wm2": poa,
-            "tcell_c": tcell,
-            "tmod_c": tmod,
-            "inverters_kw": inv,
-            "step_s": self.step_minutes * 60
+    def _row_to_payload(self, i: int, target_s: int) -> Dict[str, Any]:
+        payload = {
+            "ts_ms": int(target_s) * 1000,
+            "poa_wm2": float(self._poa[i]),
+            "tcell_c": float(self._tcell[i]),
+            "tmod_c": float(self._tmod[i]) if self._tmod is not None else None,
+            "inverters_kw": [float(v) for v in self._inv[i]],
+            "step_s": self.step_s
         }
+        if self._sensors:
+            payload["sensors"] = {c: float(v[i]) for c, v in self._sensors.items()}
+        return payload
+
+@dataclass
+class HistoryReader(FileDataProvider):
+    """
+    Mesmo CSV e mesma interface de arrays do FileDataProvider, mas indexado pelo epoch real:
+    anos diferentes não colapsam num ano de replay. Para análises de histórico (ex.: PLR).
+
+    Com start_utc/end_utc só a janela [start, end) fica em memória: o CSV é lido em blocos de
+    chunk_rows linhas (só as colunas usadas) e filtrado bloco a bloco. Se csv_path tiver
+    "{year}" (ex.: "hist/usina_{year}.csv"), só os arquivos dos anos da janela são abertos;
+    senão cada leitura percorre o arquivo todo.
+    """
+    start_utc: Optional[datetime] = None
+    end_utc: Optional[datetime] = None
+    chunk_rows: int = 500_000
+
+    def _paths(self) -> List[str]:
+        if "{year}" not in self.csv_path:
+            return [self.csv_path]
+        if self.start_utc is None or self.end_utc is None:
+            raise ValueError("csv_path com {year} exige start_utc e end_utc.")
+        last = (self.end_utc - timedelta(microseconds=1)).year
+        paths = [self.csv_path.format(year=y) for y in range(self.start_utc.year, last + 1)]
+        return [p for p in paths if os.path.exists(p)]
+
+    def _read_frame(self) -> pd.DataFrame:
+        usecols = [self.date_col] + ([self.time_col] if self.time_col else []) + self._value_cols()
+        lo = pd.Timestamp(self.start_utc) if self.start_utc is not None else None
+        hi = pd.Timestamp(self.end_utc) if self.end_utc is not None else None
+        parts = []
+        for path in self._paths():
+            for chunk in pd.read_csv(path, sep=self.sep, decimal=self.decimal, usecols=usecols,
+                                     chunksize=self.chunk_rows):
+                dt = self._parse_stamps(chunk)
+                keep = dt.notna()
+                if lo is not None:
+                    keep &= dt >= lo
+                if hi is not None:
+                    keep &= dt < hi
+                if keep.any():
+                    parts.append(chunk[keep].assign(__src_dt=dt[keep]))
+        if parts:
+            return pd.concat(parts, ignore_index=True)
+        empty = pd.DataFrame({c: pd.Series(dtype=float) for c in usecols})
+        return empty.assign(__src_dt=pd.Series(dtype="datetime64[ns, UTC]"))
+
+    @property
+    def empty(self) -> bool:
+        return not len(self._epoch_s)
+
+    @staticmethod
+    def _keys(epoch_s: np.ndarray) -> np.ndarray:
+        return np.asarray(epoch_s, dtype=np.int64)
+
+    @property
+    def span(self) -> Tuple[datetime, datetime]:
+        """Primeiro e último instante com dados (UTC, relógio dos dados)."""
+        if not len(self._epoch_s):
+            raise ValueError("Histórico vazio.")
+        return (datetime.fromtimestamp(int(self._epoch_s[0]), tz=timezone.utc),
+                datetime.fromtimestamp(int(self._epoch_s[-1]), tz=timezone.utc))
@@ -0,0 +1,109 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+@dataclass
+class Resampled:
+    ts_s: np.ndarray        # início de cada janela (epoch s), shape (m,)
+    mean: np.ndarray        # média ponderada no tempo, shape (m, k)
+    energy: np.ndarray      # integral no tempo (unidade * h), shape (m, k)
+    coverage: np.ndarray    # fração da janela coberta por amostras, shape (m,)
+
+def sample_durations(ts_s: np.ndarray, max_gap_s: float, default_s: float) -> np.ndarray:
+    """Duração (s) representada por cada amostra: até a próxima, limitada a max_gap_s (segura o valor)."""
+    ts_s = np.asarray(ts_s, dtype=np.int64)
+    if ts_s.size == 0:
+        return np.zeros(0, dtype=float)
+    dur = np.empty(ts_s.size, dtype=float)
+    dur[:-1] = np.diff(ts_s)
+    dur[-1] = default_s
+    return np.clip(dur, 0.0, max_gap_s)
+
+def _held_integral(ts_s: np.ndarray, dur: np.ndarray, seg: np.ndarray, rate: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """
+    Integral acumulada até cada borda de um sinal em degraus: a amostra i vale rate[i] em
+    [ts_i, ts_i + dur_i) e seg[i] = rate[i] * dur[i]. Quebra cada hold nas bordas das janelas.
+    """
+    cum = np.concatenate((np.zeros((1,) + seg.shape[1:]), np.cumsum(seg, axis=0)))
+    j = np.searchsorted(ts_s, edges, side="right") - 1
+    jj = np.maximum(j, 0)
+    part = np.clip(edges - ts_s[jj], 0.0, dur[jj])
+    if seg.ndim == 2:
+        part = part[:, None]
+    out = cum[jj] + rate[jj] * part
+    out[j < 0] = 0.0
+    return out
+
+def resample(
+    ts_s: np.ndarray,
+    values: np.ndarray,
+    out_step_s: int,
+    *,
+    max_gap_s: Optional[float] = None,
+    src_step_s: Optional[float] = None,
+) -> Resampled:
+    """
+    Reamostra séries (n, k) irregulares/alta resolução em janelas fixas de out_step_s.
+
+    Cada amostra segura seu valor até a próxima (no máximo max_gap_s); o hold é dividido nas
+    bordas das janelas, então cada segundo conta numa única janela (upsampling vira degrau).
+    Por janela calcula a média ponderada no tempo e a energia integrada (valor * h). Janelas
+    sem nenhuma cobertura são interpoladas linearmente entre vizinhas se o buraco for
+    <= max_gap_s; caso contrário NaN.
+    """
+    ts_s = np.asarray(ts_s, dtype=np.int64)
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    k = values.shape[1]
+    if ts_s.size == 0:
+        return Resampled(np.zeros(0, np.int64), np.zeros((0, k)), np.zeros((0, k)), np.zeros(0))
+
+    order = np.argsort(ts_s, kind="stable")
+    ts_s, values = ts_s[order], values[order]
+    if src_step_s is None:
+        d = np.diff(ts_s)
+        d = d[d > 0]
+        src_step_s = float(np.median(d)) if d.size else float(out_step_s)
+    if max_gap_s is None:
+        max_gap_s = max(float(out_step_s), 2.0 * src_step_s)
+
+    dur = sample_durations(ts_s, max_gap_s, src_step_s)
+    t0 = (ts_s[0] // out_step_s) * out_step_s
+    m = int(-(-(ts_s[-1] + dur[-1] - t0) // out_step_s))
+    m = max(m, int((ts_s[-1] - t0) // out_step_s) + 1)
+    edges = (t0 + np.arange(m + 1, dtype=np.int64) * out_step_s).astype(float)
+    tsf = ts_s.astype(float)
+
+    finite = np.isfinite(values).astype(float)
+    vals0 = np.where(finite > 0, values, 0.0)
+    wsum = np.diff(_held_integral(tsf, dur, finite * dur[:, None], finite, edges), axis=0)
+    vsum = np.diff(_held_integral(tsf, dur, vals0 * dur[:, None], vals0, edges), axis=0)
+    covered = np.diff(_held_integral(tsf, dur, dur, np.ones_like(dur), edges))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(wsum > 0, vsum / np.where(wsum > 0, wsum, 1.0), np.nan)
+    energy = vsum / 3600.0
+    coverage = np.minimum(covered / out_step_s, 1.0)
+    out_ts = t0 + np.arange(m, dtype=np.int64) * out_step_s
+
+    # Interpolação ciente de buracos: só preenche janelas vazias entre vizinhas próximas
+    for c in range(k):
+        col = mean[:, c]
+        have = np.isfinite(col)
+        if have.all() or not have.any():
+            continue
+        idx = np.flatnonzero(have)
+        miss = np.flatnonzero(~have)
+        pos = np.searchsorted(idx, miss)
+        inner = (pos > 0) & (pos < idx.size)
+        left = idx[np.clip(pos - 1, 0, idx.size - 1)]
+        right = idx[np.clip(pos, 0, idx.size - 1)]
+        small = inner & ((right - left - 1) * out_step_s <= max_gap_s)
+        if small.any():
+            fill = np.interp(miss[small], idx, col[idx])
+            col[miss[small]] = fill
+            energy[miss[small], c] = fill * out_step_s / 3600.0
+    return Resampled(out_ts, mean, energy, coverage)
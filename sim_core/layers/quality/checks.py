@@ -0,0 +1,268 @@
+from __future__ import annotations
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Any, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+CHECKS = ("range", "stuck", "spike", "flatline")
+
+@dataclass
+class QualityConfig:
+    poa_range: Tuple[float, float] = (0.0, 1600.0)
+    temp_range: Tuple[float, float] = (-30.0, 100.0)
+    inv_range: Tuple[float, float] = (-1.0, np.inf)
+    stuck_window_s: int = 3600          # sensor com o mesmo valor por esse tempo = travado
+    stuck_tol: float = 0.0
+    stuck_ignore_below: float = 1.0     # zeros noturnos não contam como travamento
+    spike_window: int = 7               # amostras (ímpar) da janela mediana/MAD
+    spike_n_mad: float = 6.0
+    spike_mad_floor: float = 1.0
+    flatline_window_s: int = 3600       # inversor congelado (valor != 0) com sol
+    flatline_tol: float = 0.0
+    flatline_min_poa: float = 50.0
+    chunk: int = 1_000_000
+
+    def samples(self, seconds: float, step_s: int) -> int:
+        return max(2, int(round(seconds / max(1, step_s))))
+
+# ---------------------------------------------------------------------------
+# Kernels vetorizados (n,) ou (n, k), ao longo do eixo 0
+# ---------------------------------------------------------------------------
+
+def range_mask(x: np.ndarray, lo: float, hi: float) -> np.ndarray:
+    """True onde o valor está fora de [lo, hi] ou não é finito."""
+    x = np.asarray(x, dtype=float)
+    with np.errstate(invalid="ignore"):
+        return ~((x >= lo) & (x <= hi))
+
+# Todos os kernels são causais (só olham amostras passadas) e seguem a mesma definição do
+# QualityTracker: backfill e tempo real sinalizam o mesmo tick do mesmo jeito. reset (n,)
+# marca recomeços de segmento (buracos nos dados), onde as janelas são zeradas.
+
+def _segment_start(n: int, reset: Optional[np.ndarray]) -> np.ndarray:
+    """Índice do início do segmento de cada amostra."""
+    idx = np.arange(n)
+    mark = np.zeros(n, dtype=bool) if reset is None else np.asarray(reset, dtype=bool).copy()
+    if n:
+        mark[0] = True
+    return np.maximum.accumulate(np.where(mark, idx, 0))
+
+def stuck_mask(x: np.ndarray, window: int, tol: float = 0.0, ignore_below: float = 0.0,
+               reset: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    True a partir da window-ésima amostra de uma sequência de valores iguais (|Δ| <= tol),
+    exceto |x| <= ignore_below.
+    """
+    x = np.asarray(x, dtype=float)
+    x2 = x.reshape(x.shape[0], -1)
+    n, k = x2.shape
+    if n == 0:
+        return np.zeros(x.shape, dtype=bool)
+    start = np.ones((n, k), dtype=bool)
+    with np.errstate(invalid="ignore"):
+        start[1:] = ~(np.abs(np.diff(x2, axis=0)) <= tol)
+    if reset is not None:
+        start |= np.asarray(reset, dtype=bool)[:, None]
+    idx = np.arange(n)[:, None]
+    run_pos = idx - np.maximum.accumulate(np.where(start, idx, 0), axis=0) + 1
+    with np.errstate(invalid="ignore"):
+        out = (run_pos >= window) & ~(np.abs(x2) <= ignore_below)
+    return out.reshape(x.shape)
+
+def spike_mask(x: np.ndarray, window: int = 7, n_mad: float = 6.0, mad_floor: float = 0.5,
+               chunk: int = 1_000_000, reset: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Causal: prevê x[i] = x[i-1] + mediana das diferenças das window amostras anteriores e
+    sinaliza |x[i] - previsão| > n_mad * 1.4826 * max(MAD, mad_floor). A tendência mediana
+    acompanha rampas (aquecimento de célula). Sem window amostras no segmento, não sinaliza.
+    """
+    x = np.asarray(x, dtype=float)
+    x2 = x.reshape(x.shape[0], -1)
+    n = x2.shape[0]
+    out = np.zeros(x2.shape, dtype=bool)
+    if n <= window:
+        return out.reshape(x.shape)
+    D = np.diff(x2, axis=0)
+    ok_rows = (np.arange(n) - _segment_start(n, reset)) >= window
+    for a in range(window, n, chunk):
+        b = min(n, a + chunk)
+        # janela de diferenças D[i-window : i-1] para cada i em [a, b)
+        win = sliding_window_view(D[a - window:b - 2], window - 1, axis=0)   # (b-a, k, window-1)
+        med = np.median(win, axis=-1)
+        mad = np.median(np.abs(win - med[..., None]), axis=-1)
+        scale = 1.4826 * np.maximum(mad, mad_floor)
+        with np.errstate(invalid="ignore"):
+            out[a:b] = np.abs(x2[a:b] - (x2[a - 1:b - 1] + med)) > n_mad * scale
+    out &= ok_rows[:, None]
+    return out.reshape(x.shape)
+
+def flatline_mask(inv_kw: np.ndarray, poa: np.ndarray, window: int, tol: float = 0.0,
+                  min_poa: float = 50.0, reset: Optional[np.ndarray] = None) -> np.ndarray:
+    """(n, k): leitura de inversor congelada (valor não nulo repetido) enquanto há sol."""
+    stuck = stuck_mask(inv_kw, window, tol=tol, ignore_below=0.0, reset=reset)
+    with np.errstate(invalid="ignore"):
+        sun = np.asarray(poa, dtype=float) >= min_poa
+    return stuck & sun[:, None]
+
+# ---------------------------------------------------------------------------
+# Estágio em lote (histórico)
+# ---------------------------------------------------------------------------
+
+@dataclass
+class QualityResult:
+    channels: List[str]
+    flags: Dict[str, np.ndarray]     # check -> (n, n_channels) bool
+    n_sensors: int
+
+    @property
+    def bad(self) -> np.ndarray:
+        out = np.zeros_like(next(iter(self.flags.values())))
+        for m in self.flags.values():
+            out |= m
+        return out
+
+    @property
+    def sensor_ok(self) -> np.ndarray:
+        return ~self.bad[:, :self.n_sensors].any(axis=1)
+
+    @property
+    def inverter_ok(self) -> np.ndarray:
+        return ~self.bad[:, self.n_sensors:]
+
+    @property
+    def row_ok(self) -> np.ndarray:
+        return ~self.bad.any(axis=1)
+
+    def counts(self) -> Dict[str, np.ndarray]:
+        """check -> nº de canais sinalizados por amostra (n,)."""
+        return {c: m.sum(axis=1) for c, m in self.flags.items()}
+
+def assess(arrays: Dict[str, Any], cfg: Optional[QualityConfig] = None) -> QualityResult:
+    """
+    Aplica range/stuck/spike/flatline sobre os arrays de FileDataProvider.get_arrays_between.
+    Canais: poa, tcell, [tmod], inv_0..inv_{k-1}.
+    """
+    cfg = cfg or QualityConfig()
+    step_s = int(arrays.get("step_s", 900))
+    poa = np.asarray(arrays["poa_wm2"], dtype=float)
+    sensors = [("poa", poa, cfg.poa_range), ("tcell", np.asarray(arrays["tcell_c"], dtype=float), cfg.temp_range)]
+    if arrays.get("tmod_c") is not None:
+        sensors.append(("tmod", np.asarray(arrays["tmod_c"], dtype=float), cfg.temp_range))
+    inv = np.asarray(arrays["inverters_kw"], dtype=float).reshape(len(poa), -1)
+    channels = [s[0] for s in sensors] + [f"inv_{i}" for i in range(inv.shape[1])]
+    S = np.column_stack([s[1] for s in sensors]) if len(poa) else np.zeros((0, len(sensors)))
+    n, ns, k = len(poa), len(sensors), inv.shape[1]
+    reset = None
+    if arrays.get("ts_ms") is not None and n:
+        # mesmo critério de buraco do QualityTracker
+        reset = np.zeros(n, dtype=bool)
+        reset[1:] = np.diff(np.asarray(arrays["ts_ms"], dtype=np.int64)) > 2 * step_s * 1000
+
+    rng = np.zeros((n, ns + k), dtype=bool)
+    for j, (_, col, (lo, hi)) in enumerate(sensors):
+        rng[:, j] = range_mask(col, lo, hi)
+    rng[:, ns:] = range_mask(inv, *cfg.inv_range)
+
+    stuck = np.zeros((n, ns + k), dtype=bool)
+    stuck[:, :ns] = stuck_mask(S, cfg.samples(cfg.stuck_window_s, step_s), cfg.stuck_tol, cfg.stuck_ignore_below,
+                                  reset=reset)
+
+    spike = np.zeros((n, ns + k), dtype=bool)
+    spike[:, 1:ns] = spike_mask(S[:, 1:], cfg.spike_window, cfg.spike_n_mad, cfg.spike_mad_floor, cfg.chunk,
+                                 reset=reset)
+
+    flat = np.zeros((n, ns + k), dtype=bool)
+    flat[:, ns:] = flatline_mask(inv, poa, cfg.samples(cfg.flatline_window_s, step_s),
+                                 cfg.flatline_tol, cfg.flatline_min_poa, reset=reset)
+
+    return QualityResult(channels, {"range": rng, "stuck": stuck, "spike": spike, "flatline": flat}, ns)
+
+# ---------------------------------------------------------------------------
+# Estágio incremental (tempo real): O(canais) por passo
+# ---------------------------------------------------------------------------
+
+def _median(v: List[float]) -> float:
+    s = sorted(v)
+    m = len(s) // 2
+    return s[m] if len(s) % 2 else 0.5 * (s[m - 1] + s[m])
+
+@dataclass
+class QualityTracker:
+    """
+    Versão incremental de assess() para um ponto por vez: mesmas definições causais, então o
+    veredito de cada tick é o mesmo do lote.
+    Escalar em Python puro: com ~10 canais é mais barato que montar arrays NumPy a cada passo.
+    """
+    step_s: int
+    cfg: QualityConfig = field(default_factory=QualityConfig)
+
+    def __post_init__(self):
+        self._stuck_n = self.cfg.samples(self.cfg.stuck_window_s, self.step_s)
+        self._flat_n = self.cfg.samples(self.cfg.flatline_window_s, self.step_s)
+        self._last: List[float] = []
+        self._run: List[int] = []
+        self._hist: List[Deque[float]] = []
+        self._last_ts: Optional[int] = None
+
+    def step(self, point: Dict[str, Any]) -> Dict[str, Any]:
+        """Retorna {"flags": {check: nº canais}, "sensor_ok": bool, "inverter_ok": [bool], "ok": bool}."""
+        cfg = self.cfg
+        tmod = point.get("tmod_c")
+        sens = [float(point["poa_wm2"]), float(point["tcell_c"])] + ([float(tmod)] if tmod is not None else [])
+        ns = len(sens)
+        x = sens + [float(v) for v in point["inverters_kw"]]
+        if len(self._last) != len(x):
+            self._last = [math.nan] * len(x)
+            self._run = [0] * len(x)
+            self._hist = [deque(maxlen=cfg.spike_window) for _ in range(ns)]
+        ts_ms = point.get("ts_ms")
+        if ts_ms is not None and self._last_ts is not None and ts_ms - self._last_ts > 2 * self.step_s * 1000:
+            # buraco nos dados: janelas antigas não representam mais o sinal
+            self._run = [0] * len(x)
+            self._hist = [deque(maxlen=cfg.spike_window) for _ in range(ns)]
+        self._last_ts = ts_ms
+
+        counts = {"range": 0, "stuck": 0, "spike": 0, "flatline": 0}
+        bad = [False] * len(x)
+        sunny = x[0] >= cfg.flatline_min_poa
+        for j, v in enumerate(x):
+            sensor = j < ns
+            lo, hi = cfg.poa_range if j == 0 else (cfg.temp_range if sensor else cfg.inv_range)
+            if not (lo <= v <= hi):
+                counts["range"] += 1
+                bad[j] = True
+
+            tol = cfg.stuck_tol if sensor else cfg.flatline_tol
+            self._run[j] = self._run[j] + 1 if abs(v - self._last[j]) <= tol else 1
+            self._last[j] = v
+            if sensor:
+                if self._run[j] >= self._stuck_n and not abs(v) <= cfg.stuck_ignore_below:
+                    counts["stuck"] += 1
+                    bad[j] = True
+            elif sunny and v != 0.0 and self._run[j] >= self._flat_n:
+                counts["flatline"] += 1
+                bad[j] = True
+
+            if sensor and j > 0:
+                h = self._hist[j]
+                # janela limitada recebe todo tick; com NaN dentro dela o teste fica desligado
+                if len(h) == cfg.spike_window and not any(u != u for u in h):
+                    # causal: prevê pela tendência mediana (acompanha rampas de aquecimento)
+                    hl = list(h)
+                    d = [b - a for a, b in zip(hl, hl[1:])]
+                    med = _median(d)
+                    mad = _median([abs(u - med) for u in d])
+                    if abs(v - (hl[-1] + med)) > cfg.spike_n_mad * 1.4826 * max(mad, cfg.spike_mad_floor):
+                        counts["spike"] += 1
+                        bad[j] = True
+                h.append(v)
+
+        return {
+            "flags": counts,
+            "sensor_ok": not any(bad[:ns]),
+            "inverter_ok": [not b for b in bad[ns:]],
+            "ok": not any(bad),
+        }
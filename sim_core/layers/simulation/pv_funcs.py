@@ -1,9 +1,20 @@
 from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Literal, Optional
+
+import numpy as np
 import pvlib
 import pandas as pd
 
+SimModel = Literal["pvwatts", "cec"]
+
+@lru_cache(maxsize=1)
+def _cec_table() -> pd.DataFrame:
+    return pvlib.pvsystem.retrieve_sam("CECMod")
+
 def retrieve_module_data(module_name: str) -> dict:
-    cec = pvlib.pvsystem.retrieve_sam("CECMod")
+    cec = _cec_table()
     if module_name in cec:
         return dict(cec[module_name])
     first_key = list(cec.keys())[0]
@@ -23,9 +34,99 @@ def array_p0_kw(module_name: str, modules_by_inverter: int, n_inverters: int) ->
     stc_w = module_stc_w(module)
     return (n_inverters * modules_by_inverter * stc_w) / 1000.0
 
-def simulate(module_name, poa, temp_cell, modules_by_inverter, derate=1.0):
+def pvwatts_module_w(module: dict, poa: np.ndarray, temp_cell: np.ndarray) -> np.ndarray:
+    """Potência DC por módulo (W) pelo pvwatts_dc, vetorizado (parâmetros escalares ou arrays broadcastáveis)."""
+    gamma_pdc = np.asarray(module["gamma_r"], dtype=float) / 100.0
+    pdc = pvlib.pvsystem.pvwatts_dc(poa, temp_cell, np.asarray(module["STC"], dtype=float), gamma_pdc, temp_ref=25.0)
+    return np.asarray(pdc, dtype=float)
+
+CEC_PARAM_KEYS = ("alpha_sc", "a_ref", "I_L_ref", "I_o_ref", "R_sh_ref", "R_s", "Adjust")
+
+def cec_module_w(module: dict, poa: np.ndarray, temp_cell: np.ndarray) -> np.ndarray:
+    """
+    Potência DC por módulo (W) no ponto de máxima potência (calcparams_cec + singlediode).
+    Os parâmetros do módulo podem ser escalares ou arrays broadcastáveis contra (poa, temp_cell).
+    POA <= 0 dá 0 W; POA ou Tcell NaN dá NaN, como no pvwatts_module_w.
+    """
+    poa = np.asarray(poa, dtype=float)
+    temp_cell = np.asarray(temp_cell, dtype=float)
+    params = {k: np.asarray(module[k], dtype=float) for k in CEC_PARAM_KEYS}
+    shape = np.broadcast_shapes(poa.shape, temp_cell.shape, *(v.shape for v in params.values()))
+    out = np.zeros(shape, dtype=float)
+    poa_b = np.broadcast_to(poa, shape)
+    tcell_b = np.broadcast_to(temp_cell, shape)
+    valid = np.isfinite(poa_b) & np.isfinite(tcell_b)
+    out[~valid] = np.nan
+    lit = valid & (poa_b > 0)
+    if not lit.any():
+        return out
+    p = {k: np.broadcast_to(v, shape)[lit] for k, v in params.items()}
+    il, io, rs, rsh, nnsvth = pvlib.pvsystem.calcparams_cec(poa_b[lit], tcell_b[lit], **p)
+    res = pvlib.pvsystem.singlediode(il, io, rs, rsh, nnsvth, method="lambertw")
+    p_mp = np.asarray(res["p_mp"], dtype=float)
+    out[lit] = np.nan_to_num(np.maximum(p_mp, 0.0))
+    return out
+
+def inverter_stage_kw(pdc_kw: np.ndarray, efficiency: float = 0.98, pac_max_kw: Optional[float] = None) -> np.ndarray:
+    """Conversão DC->AC por inversor: eficiência constante e clipping em pac_max_kw."""
+    pac = np.asarray(pdc_kw, dtype=float) * efficiency
+    if pac_max_kw is not None:
+        pac = np.minimum(pac, pac_max_kw)
+    return np.maximum(pac, 0.0)
+
+def simulate_batch(
+    module_name: str,
+    poa,
+    temp_cell,
+    modules_by_inverter: int,
+    derate: float = 1.0,
+    model: SimModel = "pvwatts",
+    inverter_eff: float = 0.98,
+    inverter_pac_max_kw: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Potência ideal por inversor (kW) para arrays de (poa, tcell).
+      - "pvwatts": pvwatts_dc * derate (o derate já absorve perdas do inversor)
+      - "cec": single-diode CEC * derate, seguido do estágio de inversor (eficiência/clipping)
+    """
     module = retrieve_module_data(module_name)
-    gamma_pdc = (module['gamma_r']) / 100.0
-    dc_power = pvlib.pvsystem.pvwatts_dc(poa, temp_cell, module['STC'], gamma_pdc, temp_ref=25.0)
-    per_inv_kw_no_derate = (modules_by_inverter * dc_power) / 1000.0
-    return float(per_inv_kw_no_derate * derate)
+    poa = np.asarray(poa, dtype=float)
+    temp_cell = np.asarray(temp_cell, dtype=float)
+    if model == "pvwatts":
+        return (modules_by_inverter * pvwatts_module_w(module, poa, temp_cell)) / 1000.0 * derate
+    if model == "cec":
+        pdc_kw = (modules_by_inverter * cec_module_w(module, poa, temp_cell)) / 1000.0 * derate
+        return inverter_stage_kw(pdc_kw, inverter_eff, inverter_pac_max_kw)
+    raise ValueError(f"Modelo de simulação desconhecido: {model!r}")
+
+def _simulate_chunk(args) -> np.ndarray:
+    module_name, poa, temp_cell, kwargs = args
+    return simulate_batch(module_name, poa, temp_cell, **kwargs)
+
+def simulate_batch_parallel(
+    module_name: str,
+    poa,
+    temp_cell,
+    modules_by_inverter: int,
+    *,
+    workers: int = 1,
+    chunk_size: int = 20000,
+    **kwargs,
+) -> np.ndarray:
+    """Como simulate_batch, mas divide os arrays em blocos e distribui num pool de processos."""
+    poa = np.asarray(poa, dtype=float)
+    temp_cell = np.asarray(temp_cell, dtype=float)
+    kwargs["modules_by_inverter"] = modules_by_inverter
+    if workers <= 1 or poa.size <= chunk_size:
+        return simulate_batch(module_name, poa, temp_cell, **kwargs)
+    bounds = range(0, poa.size, chunk_size)
+    jobs = [(module_name, poa[i:i + chunk_size], temp_cell[i:i + chunk_size], kwargs) for i in bounds]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        parts = list(ex.map(_simulate_chunk, jobs))
+    return np.concatenate(parts)
+
+def simulate(module_name, poa, temp_cell, modules_by_inverter, derate=1.0, model: SimModel = "pvwatts",
+             inverter_eff: float = 0.98, inverter_pac_max_kw: Optional[float] = None):
+    kw = simulate_batch(module_name, [poa], [temp_cell], modules_by_inverter, derate=derate, model=model,
+                        inverter_eff=inverter_eff, inverter_pac_max_kw=inverter_pac_max_kw)
+    return float(kw[0])
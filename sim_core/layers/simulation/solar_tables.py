@@ -0,0 +1,70 @@
+from __future__ import annotations
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import pvlib
+
+@dataclass
+class SunTable:
+    """
+    Nascer/pôr do sol por dia do ano (1..366) para a usina, em segundos do dia no relógio dos dados
+    (UTC + clock_offset_h, já que o CSV traz hora local rotulada como UTC). Calculado uma vez com
+    pvlib (SPA) e salvo em cache_dir; margin_min alarga a janela de dia nas duas pontas.
+    """
+    latitude: float
+    longitude: float
+    clock_offset_h: float = 0.0
+    margin_min: float = 45.0
+    cache_dir: str = "./.cache"
+    sunrise_s: np.ndarray = field(init=False, repr=False)
+    sunset_s: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self):
+        path = os.path.join(
+            self.cache_dir, f"sun_{self.latitude:.4f}_{self.longitude:.4f}_{self.clock_offset_h:+.2f}.npz"
+        )
+        if os.path.exists(path):
+            z = np.load(path)
+            rise, sset = z["sunrise_s"], z["sunset_s"]
+        else:
+            rise, sset = self._compute()
+            os.makedirs(self.cache_dir, exist_ok=True)
+            np.savez(path, sunrise_s=rise, sunset_s=sset)
+        margin = self.margin_min * 60.0
+        # índice 0 sem uso; dias polares (NaN) viram "sempre dia" por segurança
+        self.sunrise_s = np.where(np.isfinite(rise), rise - margin, -np.inf)
+        self.sunset_s = np.where(np.isfinite(sset), sset + margin, np.inf)
+
+    def _compute(self):
+        # ano bissexto de referência para cobrir o dia 366; meio-dia local evita trocar de data
+        days = pd.date_range("2024-01-01", "2024-12-31", freq="D", tz="UTC")
+        noon = days + pd.Timedelta(hours=12 - self.longitude / 15.0)
+        rst = pvlib.solarposition.sun_rise_set_transit_spa(noon, self.latitude, self.longitude)
+        offset = pd.Timedelta(hours=self.clock_offset_h)
+        rise = np.full(367, np.nan)
+        sset = np.full(367, np.nan)
+        for col, out in (("sunrise", rise), ("sunset", sset)):
+            t = pd.DatetimeIndex(rst[col]).tz_convert("UTC").tz_localize(None) + offset
+            sod = (t - days.tz_localize(None)).total_seconds().to_numpy()
+            out[1:] = sod
+        return rise, sset
+
+    def _lookup(self, epoch_s: np.ndarray):
+        dt = np.asarray(epoch_s, dtype=np.int64).astype("datetime64[s]")
+        year = dt.astype("datetime64[Y]")
+        doy = (dt.astype("datetime64[D]") - year).astype(np.int64) + 1
+        # anos não bissextos: a partir de 1º/mar usa a linha de 2024 com mesmo mês/dia
+        leap = ((year.astype(np.int64) + 1970) % 4 == 0)
+        doy = np.where(~leap & (doy >= 60), doy + 1, doy)
+        sod = np.asarray(epoch_s, dtype=np.int64) % 86400
+        return doy, sod
+
+    def night_mask(self, ts_ms) -> np.ndarray:
+        """True para instantes (epoch ms, relógio dos dados) fora de [nascer - margem, pôr + margem]."""
+        doy, sod = self._lookup(np.asarray(ts_ms, dtype=np.int64) // 1000)
+        return (sod < self.sunrise_s[doy]) | (sod > self.sunset_s[doy])
+
+    def is_night(self, ts_ms: int) -> bool:
+        return bool(self.night_mask(np.array([ts_ms]))[0])
@@ -0,0 +1,145 @@
+from __future__ import annotations
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from layers.simulation.pv_funcs import simulate_batch, SimModel
+
+@dataclass
+class PowerSurface:
+    """
+    Superfície pré-calculada de potência ideal por inversor (kW) em função de (POA, Tcell).
+
+    A grade é uniforme em (sqrt(POA), Tcell), mais densa em baixa irradiância onde o
+    single-diode tem maior curvatura, e é refinada na construção até que o erro da
+    interpolação bilinear, medido contra o modelo exato nos centros e pontos médios das
+    células e multiplicado por safety, fique abaixo de tol_kw (ou até max_points por eixo).
+    error_bound_kw é essa estimativa amostral, não um limite garantido; within_tol indica se
+    ela atingiu tol_kw (caso contrário o chamador deve usar o modelo exato).
+    O clipping do inversor (pac_max) não entra na grade: ela guarda a potência AC sem clipping,
+    suave, e o min(., pac_max) é aplicado depois da interpolação (não aumenta o erro).
+    Fora da grade cai no modelo exato.
+    """
+    module_name: str
+    modules_by_inverter: int
+    derate: float = 1.0
+    model: SimModel = "pvwatts"
+    inverter_eff: float = 0.98
+    inverter_pac_max_kw: Optional[float] = None
+    poa_range: Tuple[float, float] = (0.0, 1500.0)  # POA >= 0 (eixo em sqrt)
+    tcell_range: Tuple[float, float] = (-10.0, 90.0)
+    tol_kw: float = 0.5
+    start_points: int = 65
+    max_points: int = 1025
+    safety: float = 1.5
+    grid_kw: np.ndarray = field(init=False, repr=False)
+    error_bound_kw: float = field(init=False)
+    within_tol: bool = field(init=False)
+
+    def __post_init__(self):
+        n = self.start_points
+        while True:
+            self._build(n)
+            self.error_bound_kw = self.safety * self._validate()
+            if self.error_bound_kw <= self.tol_kw or n >= self.max_points:
+                break
+            n = min(2 * n - 1, self.max_points)
+        self.within_tol = self.error_bound_kw <= self.tol_kw
+
+    def _clip(self, kw):
+        if self.model == "cec" and self.inverter_pac_max_kw is not None:
+            return np.minimum(kw, self.inverter_pac_max_kw)
+        return kw
+
+    def _smooth(self, poa, tcell) -> np.ndarray:
+        """Modelo exato sem o clipping do inversor (o que a grade interpola)."""
+        return simulate_batch(
+            self.module_name, poa, tcell, self.modules_by_inverter, derate=self.derate, model=self.model,
+            inverter_eff=self.inverter_eff, inverter_pac_max_kw=None,
+        )
+
+    def _exact(self, poa, tcell) -> np.ndarray:
+        return simulate_batch(
+            self.module_name, poa, tcell, self.modules_by_inverter, derate=self.derate, model=self.model,
+            inverter_eff=self.inverter_eff, inverter_pac_max_kw=self.inverter_pac_max_kw,
+        )
+
+    def _build(self, n: int):
+        self._u_axis = np.linspace(np.sqrt(self.poa_range[0]), np.sqrt(self.poa_range[1]), n)
+        self.poa_axis = self._u_axis ** 2
+        self.tcell_axis = np.linspace(*self.tcell_range, n)
+        self._du = self._u_axis[1] - self._u_axis[0]
+        self._dt = self.tcell_axis[1] - self.tcell_axis[0]
+        P, T = np.meshgrid(self.poa_axis, self.tcell_axis, indexing="ij")
+        self.grid_kw = self._smooth(P.ravel(), T.ravel()).reshape(P.shape)
+
+    def _validate(self) -> float:
+        """Erro máximo (kW) nos centros e pontos médios das arestas das células."""
+        pm = (0.5 * (self._u_axis[:-1] + self._u_axis[1:])) ** 2
+        tm = 0.5 * (self.tcell_axis[:-1] + self.tcell_axis[1:])
+        err = 0.0
+        for pa, ta in ((pm, tm), (pm, self.tcell_axis), (self.poa_axis, tm)):
+            P, T = np.meshgrid(pa, ta, indexing="ij")
+            p, t = P.ravel(), T.ravel()
+            err = max(err, float(np.max(np.abs(self._interp(p, t) - self._smooth(p, t)))))
+        return err
+
+    def _interp(self, poa: np.ndarray, tcell: np.ndarray) -> np.ndarray:
+        n_p, n_t = self.grid_kw.shape
+        x = (np.sqrt(poa) - self._u_axis[0]) / self._du
+        y = (tcell - self.tcell_axis[0]) / self._dt
+        i = np.clip(np.floor(x).astype(np.intp), 0, n_p - 2)
+        j = np.clip(np.floor(y).astype(np.intp), 0, n_t - 2)
+        fx = x - i
+        fy = y - j
+        g = self.grid_kw
+        return ((1 - fx) * (1 - fy) * g[i, j] + fx * (1 - fy) * g[i + 1, j]
+                + (1 - fx) * fy * g[i, j + 1] + fx * fy * g[i + 1, j + 1])
+
+    def inside(self, poa: np.ndarray, tcell: np.ndarray) -> np.ndarray:
+        return ((poa >= self.poa_range[0]) & (poa <= self.poa_range[1])
+                & (tcell >= self.tcell_range[0]) & (tcell <= self.tcell_range[1]))
+
+    def evaluate(self, poa, tcell) -> np.ndarray:
+        """Potência ideal por inversor (kW); pontos fora da grade (ou NaN) usam o modelo exato."""
+        poa = np.asarray(poa, dtype=float)
+        tcell = np.asarray(tcell, dtype=float)
+        poa, tcell = np.broadcast_arrays(poa, tcell)
+        ok = self.inside(poa, tcell)
+        out = np.empty(poa.shape, dtype=float)
+        out[ok] = self._clip(self._interp(poa[ok], tcell[ok]))
+        if not ok.all():
+            out[~ok] = self._exact(poa[~ok], tcell[~ok])
+        return out
+
+    def __call__(self, poa: float, tcell: float) -> float:
+        """Avaliação escalar para o laço de tempo real."""
+        if not (self.poa_range[0] <= poa <= self.poa_range[1] and self.tcell_range[0] <= tcell <= self.tcell_range[1]):
+            return float(self._exact([poa], [tcell])[0])
+        n_p, n_t = self.grid_kw.shape
+        x = (math.sqrt(poa) - self._u_axis[0]) / self._du
+        y = (tcell - self.tcell_axis[0]) / self._dt
+        i = min(int(x), n_p - 2)
+        j = min(int(y), n_t - 2)
+        fx = x - i
+        fy = y - j
+        g = self.grid_kw
+        kw = ((1 - fx) * (1 - fy) * g[i, j] + fx * (1 - fy) * g[i + 1, j]
+              + (1 - fx) * fy * g[i, j + 1] + fx * fy * g[i + 1, j + 1])
+        if self.model == "cec" and self.inverter_pac_max_kw is not None:
+            kw = min(kw, self.inverter_pac_max_kw)
+        return float(kw)
+
+_SURFACES: Dict[tuple, PowerSurface] = {}
+
+def get_surface(module_name: str, modules_by_inverter: int, derate: float = 1.0, model: SimModel = "pvwatts",
+                **kwargs) -> PowerSurface:
+    """Reaproveita superfícies já construídas entre usinas que compartilham módulo/arranjo/derate."""
+    key = (module_name, int(modules_by_inverter), float(derate), model, tuple(sorted(kwargs.items())))
+    surf = _SURFACES.get(key)
+    if surf is None:
+        surf = PowerSurface(module_name, modules_by_inverter, derate=derate, model=model, **kwargs)
+        _SURFACES[key] = surf
+    return surf
@@ -0,0 +1,98 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+
+from layers.simulation.pv_funcs import (
+    retrieve_module_data, module_stc_w, pvwatts_module_w, cec_module_w, inverter_stage_kw, SimModel, CEC_PARAM_KEYS
+)
+
+@dataclass
+class InverterSpec:
+    module_name: str
+    modules: int
+    derate: float = 1.0
+    poa_sensor: Optional[str] = None      # None = sensor POA principal da usina
+    tcell_sensor: Optional[str] = None    # None = sensor Tcell principal da usina
+    pac_max_kw: Optional[float] = None
+
+@dataclass
+class PlantTopology:
+    """
+    Topologia heterogênea: cada inversor com seu tipo de módulo, nº de módulos, derate e sensores.
+    Os parâmetros são empilhados em vetores (k,) e a simulação roda por broadcasting em (n, k).
+    """
+    inverters: List[InverterSpec]
+    _params: Dict[str, np.ndarray] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        modules = [retrieve_module_data(s.module_name) for s in self.inverters]
+        keys = ("STC", "gamma_r") + CEC_PARAM_KEYS
+        self._params = {k: np.array([float(m[k]) for m in modules]) for k in keys}
+        self._stc_w = np.array([module_stc_w(m) for m in modules])
+        self._modules = np.array([s.modules for s in self.inverters], dtype=float)
+        self._derate = np.array([s.derate for s in self.inverters], dtype=float)
+        self._pac_max = np.array([np.inf if s.pac_max_kw is None else s.pac_max_kw for s in self.inverters])
+
+    @classmethod
+    def uniform(cls, module_name: str, modules_by_inverter: int, n_inverters: int, derate: float = 1.0) -> "PlantTopology":
+        return cls([InverterSpec(module_name, modules_by_inverter, derate) for _ in range(n_inverters)])
+
+    @classmethod
+    def from_dicts(cls, items: Sequence[Dict[str, Any]], **defaults) -> "PlantTopology":
+        """Monta a partir de dicts (ex.: config.TOPOLOGY); chaves ausentes usam defaults."""
+        return cls([InverterSpec(**{**defaults, **it}) for it in items])
+
+    def validate(self, n_inverter_cols: int, sensor_cols: Sequence[str] = ()):
+        """Confere a topologia contra as colunas do provider (um inversor por coluna, sensores existentes)."""
+        if self.n_inverters != n_inverter_cols:
+            raise ValueError(
+                f"TOPOLOGY tem {self.n_inverters} inversores, mas há {n_inverter_cols} colunas de inversor."
+            )
+        missing = sorted({n for s in self.inverters for n in (s.poa_sensor, s.tcell_sensor)
+                          if n and n not in sensor_cols})
+        if missing:
+            raise ValueError(f"Sensores da TOPOLOGY fora de SENSOR_COLS: {missing}")
+
+    @property
+    def n_inverters(self) -> int:
+        return len(self.inverters)
+
+    def p0_kw(self) -> float:
+        """Potência nominal DC a STC de todo o arranjo (kW)."""
+        return float(np.sum(self._modules * self._stc_w) / 1000.0)
+
+    def _column_matrix(self, main: np.ndarray, sensors: Optional[Dict[str, np.ndarray]], attr: str) -> np.ndarray:
+        """(n, k): coluna do sensor atribuído a cada inversor (ou o principal)."""
+        main = np.asarray(main, dtype=float).reshape(-1)
+        names = [getattr(s, attr) for s in self.inverters]
+        if all(n is None for n in names):
+            return main[:, None]
+        extra = list(dict.fromkeys(n for n in names if n))
+        stacked = np.column_stack([main] + [np.asarray(sensors[n], dtype=float).reshape(-1) for n in extra])
+        return stacked[:, [extra.index(n) + 1 if n else 0 for n in names]]
+
+    def simulate(
+        self,
+        poa,
+        tcell,
+        sensors: Optional[Dict[str, np.ndarray]] = None,
+        model: SimModel = "pvwatts",
+        inverter_eff: float = 0.98,
+        inverter_pac_max_kw: Optional[float] = None,
+    ) -> np.ndarray:
+        """Potência ideal (kW) por amostra e inversor, shape (n, k), sem laço por inversor."""
+        poa_m = self._column_matrix(poa, sensors, "poa_sensor")
+        tcell_m = self._column_matrix(tcell, sensors, "tcell_sensor")
+        if model == "pvwatts":
+            w = pvwatts_module_w(self._params, poa_m, tcell_m)
+        elif model == "cec":
+            w = cec_module_w(self._params, poa_m, tcell_m)
+        else:
+            raise ValueError(f"Modelo de simulação desconhecido: {model!r}")
+        kw = np.broadcast_to(w, np.broadcast_shapes(w.shape, (1, self.n_inverters))) * self._modules / 1000.0 * self._derate
+        if model == "cec":
+            pac_max = self._pac_max if inverter_pac_max_kw is None else np.minimum(self._pac_max, inverter_pac_max_kw)
+            kw = np.minimum(inverter_stage_kw(kw, inverter_eff), pac_max)
+        return kw
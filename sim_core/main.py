@@ -4,6 +4,7 @@ import threading, signal, time
 import config as C
 from layers.generation.file_provider import FileDataProvider
 from layers.emission.victoria import DataEmitter
+from layers.emission.sinks import make_sink
 from pipelines.realtime_file import loop_realtime_from_file
 from pipelines.backfill_file import run_backfill_from_file
 from layers.alerts.alarms import (
@@ -11,19 +12,35 @@ from layers.alerts.alarms import (
     TemperatureDeltaAlarm, RampIrradianceAlarm
 )
 from layers.calibration.derate import DerateCalibrator
+from layers.simulation.surface import get_surface
+from layers.simulation.topology import PlantTopology
+from layers.simulation.solar_tables import SunTable
+from layers.quality.checks import QualityConfig
+from layers.archive.parquet import ParquetArchive
 
 def main():
     provider = FileDataProvider(
         csv_path=C.CSV_PATH,
         date_col=C.DATE_COL,
         time_col=C.TIME_COL,
+        date_format=getattr(C, "DATE_FORMAT", None),
         inverter_cols=C.INVERTER_COLS,
         poa_col=C.POA_COL,
         tcell_col=C.TCELL_COL,
         tmod_col=C.TMOD_COL if hasattr(C, "TMOD_COL") else None,
-        decimal=",", sep=","
+        decimal=",", sep=",",
+        out_step_s=getattr(C, "OUTPUT_STEP_S", None),
+        max_gap_s=getattr(C, "RESAMPLE_MAX_GAP_S", None),
+        sensor_cols=getattr(C, "SENSOR_COLS", None) or None,
     )
-    emitter = DataEmitter(C.VM_URL)
+    emitter = DataEmitter(C.VM_URL, sink=make_sink(C))
+    sim_opts = dict(
+        model=getattr(C, "SIM_MODEL", "pvwatts"),
+        inverter_eff=getattr(C, "INVERTER_EFFICIENCY", 0.98),
+        inverter_pac_max_kw=getattr(C, "INVERTER_PAC_MAX_KW", None),
+    )
+    workers = getattr(C, "SIM_WORKERS", 1)
+    quality = QualityConfig() if getattr(C, "QUALITY_CHECKS", True) else None
 
     auto = getattr(C, "AUTO_CALIBRATE_DERATE", True)
     derate = getattr(C, "DERATE", 1.0)
@@ -37,7 +54,10 @@ def main():
             day_thr=C.DAY_GHI_THRESHOLD,
             days=60,
             method="both",
-            dmin=0.5, dmax=1.3
+            dmin=0.5, dmax=1.3,
+            workers=workers,
+            quality=quality,
+            **sim_opts
         )
         try:
             derate, met = calib.estimate()
@@ -45,7 +65,47 @@ def main():
         except Exception as e:
             print(f">> Aviso: calibração falhou ({e}). Usando DERATE do config = {derate}")
 
+    topology = None
+    if getattr(C, "TOPOLOGY", None):
+        topology = PlantTopology.from_dicts(
+            C.TOPOLOGY, module_name=C.MODULE_NAME, modules=C.MODULES_BY_INVERTER, derate=derate
+        )
+        topology.validate(len(C.INVERTER_COLS), getattr(C, "SENSOR_COLS", None) or [])
+
+    surface = None
+    if getattr(C, "SIM_SURFACE", False) and topology is not None:
+        print(">> Aviso: SIM_SURFACE é ignorado com TOPOLOGY (a superfície é de um arranjo uniforme).")
+    elif getattr(C, "SIM_SURFACE", False):
+        surface = get_surface(
+            C.MODULE_NAME, C.MODULES_BY_INVERTER, derate=derate,
+            tol_kw=getattr(C, "SIM_SURFACE_TOL_KW", 0.5), **sim_opts
+        )
+        if surface.within_tol:
+            print(f">> Superfície (POA, Tcell) {surface.grid_kw.shape} | erro estimado ≤ {surface.error_bound_kw:.3f} kW")
+        else:
+            print(f">> Aviso: superfície não atingiu SIM_SURFACE_TOL_KW (erro estimado {surface.error_bound_kw:.3f} kW). "
+                  "Usando o modelo exato.")
+            surface = None
+
+    sun = None
+    if getattr(C, "NIGHT_FAST_PATH", False):
+        if getattr(C, "LATITUDE", None) is None or getattr(C, "LONGITUDE", None) is None:
+            raise ValueError("NIGHT_FAST_PATH requer LATITUDE e LONGITUDE da usina no config.")
+        sun = SunTable(
+            C.LATITUDE, C.LONGITUDE,
+            clock_offset_h=getattr(C, "CLOCK_UTC_OFFSET_H", 0.0),
+            cache_dir=getattr(C, "SUN_CACHE_DIR", "./.cache"),
+        )
+    night_heartbeat_s = getattr(C, "NIGHT_HEARTBEAT_S", 3600)
+    night_pac_kw = getattr(C, "NIGHT_PAC_KW", 0.05)
+
+    archive = None
+    if getattr(C, "ARCHIVE_DIR", None):
+        archive = ParquetArchive(C.ARCHIVE_DIR, plant=getattr(C, "PLANT_ID", "UFV_X"))
+
     alert_emitter = emitter.make_alert_emitter()
+    if archive is not None:
+        alert_emitter = archive.alert_emitter(alert_emitter)
     alarms = [
         PRLowAlarm(warn=0.82, crit=0.70, clear=0.86, labels={"plant": "UFV_X"}),
         InverterOfflineAlarm(n_inverters=C.N_INVERTERS, min_kw=0.05, min_poa_wm2=200.0, labels={"plant": "UFV_X"}),
@@ -68,6 +128,15 @@ def main():
             horizon_days=C.BACKFILL_HORIZON_DAYS,
             derate=derate,
             alarm_manager=alarm_manager,
+            workers=workers,
+            surface=surface,
+            quality=quality,
+            archive=archive,
+            topology=topology,
+            sun=sun,
+            night_heartbeat_s=night_heartbeat_s,
+            night_pac_kw=night_pac_kw,
+            **sim_opts
         ),
         daemon=True
     )
@@ -83,6 +152,14 @@ def main():
             day_thr=C.DAY_GHI_THRESHOLD,
             derate=derate,
             alarm_manager=alarm_manager,
+            surface=surface,
+            quality=quality,
+            archive=archive,
+            topology=topology,
+            sun=sun,
+            night_heartbeat_s=night_heartbeat_s,
+            night_pac_kw=night_pac_kw,
+            **sim_opts
         ),
         daemon=True
     )
@@ -101,6 +178,9 @@ def main():
 
     while not stop:
         time.sleep(1)
+    emitter.close()
+    if archive is not None:
+        archive.close()
 
 if __name__ == "__main__":
     main()
@@ -2,10 +2,17 @@ from __future__ import annotations
 from datetime import datetime, timedelta, timezone
 from typing import Optional, List, Tuple
 
+import numpy as np
+
 from layers.generation.file_provider import FileDataProvider
-from layers.simulation.pv_funcs import simulate, array_p0_kw
+from layers.simulation.pv_funcs import simulate_batch_parallel, array_p0_kw
+from layers.simulation.surface import PowerSurface
+from layers.simulation.topology import PlantTopology
+from layers.simulation.solar_tables import SunTable
 from layers.emission.victoria import DataEmitter
 from layers.alerts.alarms import Observation, AlarmManager
+from layers.quality.checks import QualityConfig, assess
+from layers.archive.parquet import ParquetArchive
 
 def run_backfill_from_file(
     provider: FileDataProvider,
@@ -18,11 +25,25 @@ def run_backfill_from_file(
     day_thr: float,
     horizon_days: int,
     derate: float = 1.0,
-    alarm_manager: Optional[AlarmManager] = None
+    alarm_manager: Optional[AlarmManager] = None,
+    model: str = "pvwatts",
+    inverter_eff: float = 0.98,
+    inverter_pac_max_kw: Optional[float] = None,
+    workers: int = 1,
+    surface: Optional[PowerSurface] = None,
+    quality: Optional[QualityConfig] = None,
+    archive: Optional[ParquetArchive] = None,
+    topology: Optional[PlantTopology] = None,
+    sun: Optional[SunTable] = None,
+    night_heartbeat_s: int = 3600,
+    night_pac_kw: float = 0.05
 ):
-    step_s = provider.step_minutes * 60
+    step_s = provider.step_s
     dt_h = step_s / 3600.0
-    P0_total_kW = array_p0_kw(module_name, modules_by_inverter, n_inverters)
+    if topology is not None:
+        P0_total_kW = topology.p0_kw()
+    else:
+        P0_total_kW = array_p0_kw(module_name, modules_by_inverter, n_inverters)
 
     daily_eac = {}
     daily_hpoa = {}
@@ -40,8 +61,62 @@ def run_backfill_from_file(
     flag_points = []
     temps_points = []
     acc_points = []
+    quality_points = []
+
+    # Qualidade de dados em lote sobre os arrays da mesma janela
+    arrays = provider.get_arrays_between(start, now)
+    qa = assess(arrays, quality) if quality is not None else None
+    if qa is not None:
+        sensor_ok = qa.sensor_ok.tolist()
+        inverter_ok = qa.inverter_ok.tolist()
+        row_ok = qa.row_ok.tolist()
+        qa_counts = {c: v.tolist() for c, v in qa.counts().items()}
+
+    # Noite (tabela solar + POA nula + inversores parados): sem simulação; trechos contínuos
+    # viram caminho esparso. Potência real acima de night_pac_kw força tick completo.
+    n = len(series)
+    night = np.zeros(n, dtype=bool)
+    if sun is not None and n:
+        pac_all = np.asarray(arrays["inverters_kw"], dtype=float).reshape(n, -1).sum(axis=1)
+        with np.errstate(invalid="ignore"):
+            night = (sun.night_mask(arrays["ts_ms"]) & ~(arrays["poa_wm2"] > day_thr)
+                     & ~(np.abs(pac_all) > night_pac_kw))
+    sel = np.flatnonzero(~night)
+
+    # Simulação em lote: um único passo vetorizado para as amostras de dia
+    poa_arr = arrays["poa_wm2"][sel]
+    tcell_arr = arrays["tcell_c"][sel]
+    if topology is not None:
+        # (n, k): todos os inversores de uma vez por broadcasting
+        ideal_batch = np.zeros((n, topology.n_inverters))
+        ideal_batch[sel] = topology.simulate(
+            poa_arr, tcell_arr, sensors={c: v[sel] for c, v in arrays["sensors"].items()},
+            model=model, inverter_eff=inverter_eff, inverter_pac_max_kw=inverter_pac_max_kw,
+        )
+    else:
+        ideal_batch = np.zeros(n)
+        if surface is not None:
+            ideal_batch[sel] = surface.evaluate(poa_arr, tcell_arr)
+        else:
+            ideal_batch[sel] = simulate_batch_parallel(
+                module_name,
+                poa_arr,
+                tcell_arr,
+                modules_by_inverter,
+                derate=derate,
+                model=model,
+                inverter_eff=inverter_eff,
+                inverter_pac_max_kw=inverter_pac_max_kw,
+                workers=workers,
+            )
 
-    for p in series:
+    pr_inst_all = np.zeros(n)
+    cum_real_all = np.zeros(n)
+    cum_ideal_all = np.zeros(n)
+    heartbeat_ms = night_heartbeat_s * 1000
+    last_full_ts = None
+
+    for i, (p, ideal_per_inv_kw) in enumerate(zip(series, ideal_batch)):
         ts_ms = p["ts_ms"]
         dt = datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc)
 
@@ -51,8 +126,25 @@ def run_backfill_from_file(
         real_inverters = p["inverters_kw"]
         pac_kw_total = float(sum(real_inverters))
 
-        ideal_per_inv_kw = simulate(module_name, poa, tcell, modules_by_inverter, derate=derate)
-        ideal_total_kw = ideal_per_inv_kw * n_inverters
+        fast = (night[i] and i > 0 and night[i - 1]
+                and last_full_ts is not None and ts_ms - last_full_ts < heartbeat_ms)
+        if fast:
+            # noite: só séries que mudam (temperaturas, energia real se houver consumo)
+            temps_points.append((ts_ms, tmod, tcell))
+            if pac_kw_total != 0.0:
+                cum_real_kwh += pac_kw_total * dt_h
+                acc_points.append((ts_ms, cum_real_kwh, cum_ideal_kwh))
+            cum_real_all[i] = cum_real_kwh
+            cum_ideal_all[i] = cum_ideal_kwh
+            continue
+        last_full_ts = ts_ms
+
+        if topology is not None:
+            ideal_per_inv_kw = ideal_per_inv_kw.tolist()
+            ideal_total_kw = float(sum(ideal_per_inv_kw))
+        else:
+            ideal_per_inv_kw = float(ideal_per_inv_kw)
+            ideal_total_kw = ideal_per_inv_kw * n_inverters
 
         day_key = dt.strftime("%Y-%m-%d")
         if poa > day_thr:
@@ -62,6 +154,8 @@ def run_backfill_from_file(
         cum_real_kwh  += pac_kw_total * dt_h
         cum_ideal_kwh += ideal_total_kw * dt_h
         acc_points.append((ts_ms, cum_real_kwh, cum_ideal_kwh))
+        cum_real_all[i] = cum_real_kwh
+        cum_ideal_all[i] = cum_ideal_kwh
 
         poa_points.append((ts_ms, poa))
         pv_batches.append((ts_ms, ideal_per_inv_kw, real_inverters))
@@ -72,11 +166,15 @@ def run_backfill_from_file(
             pr_inst = pac_kw_total / (P0_total_kW * (poa / 1000.0))
         pr_inst = max(0.0, min(1.5, pr_inst))
         pr_inst_points.append((ts_ms, pr_inst))
+        pr_inst_all[i] = pr_inst
 
         sunny_flag = 1 if poa >= sunny_thr else 0
         day_flag = 1 if poa > day_thr else 0
         flag_points.append((ts_ms, sunny_flag, day_flag))
 
+        if qa is not None:
+            quality_points.append((ts_ms, {c: v[i] for c, v in qa_counts.items()}, row_ok[i]))
+
         if alarm_manager is not None:
             obs = Observation(
                 ts_ms=ts_ms,
@@ -88,7 +186,9 @@ def run_backfill_from_file(
                 day_flag=day_flag,
                 tmod_c=tmod,
                 tcell_c=tcell,
-                inverter_kw=real_inverters
+                inverter_kw=real_inverters,
+                quality_ok=sensor_ok[i] if qa is not None else True,
+                inverter_ok=inverter_ok[i] if qa is not None else None
             )
             alarm_manager.step(obs)
 
@@ -109,6 +209,8 @@ def run_backfill_from_file(
     for ts_ms, real_kwh, ideal_kwh in acc_points:
         emitter.emit_cumulative_energy(ts_ms, real_kwh, ideal_kwh)
 
+    emitter.emit_quality_bulk(quality_points)
+
     daily_items = []
     for day_key in sorted(daily_hpoa.keys()):
         H = daily_hpoa[day_key]
@@ -121,3 +223,25 @@ def run_backfill_from_file(
             )
             daily_items.append((int(noon.timestamp() * 1000), pr_daily))
     emitter.emit_pr_daily_bulk(daily_items)
+
+    if archive is not None and n:
+        poa_all = arrays["poa_wm2"]
+        real_arr = np.asarray(arrays["inverters_kw"], dtype=float).reshape(n, -1)
+        archive.append_inverters(arrays["ts_ms"], ideal_batch, real_arr)
+        with np.errstate(invalid="ignore"):
+            archive.append_plant(
+                arrays["ts_ms"],
+                poa_wm2=poa_all,
+                tcell_c=arrays["tcell_c"],
+                tmod_c=arrays["tmod_c"] if arrays["tmod_c"] is not None else np.nan,
+                pac_kw_total=real_arr.sum(axis=1),
+                ideal_total_kw=ideal_batch.sum(axis=1) if ideal_batch.ndim == 2 else ideal_batch * n_inverters,
+                pr_inst=pr_inst_all,
+                sunny_flag=(poa_all >= sunny_thr).astype(np.int8),
+                day_flag=(poa_all > day_thr).astype(np.int8),
+                quality_ok=qa.row_ok if qa is not None else 1,
+                real_kwh_total=cum_real_all,
+                ideal_kwh_total=cum_ideal_all,
+            )
+        archive.append_pr_daily(daily_items)
+        archive.flush()
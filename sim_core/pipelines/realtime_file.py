@@ -4,8 +4,13 @@ from typing import Optional
 
 from layers.generation.file_provider import FileDataProvider
 from layers.simulation.pv_funcs import simulate, array_p0_kw
+from layers.simulation.surface import PowerSurface
+from layers.simulation.topology import PlantTopology
+from layers.simulation.solar_tables import SunTable
 from layers.emission.victoria import DataEmitter
 from layers.alerts.alarms import Observation, AlarmManager
+from layers.quality.checks import QualityConfig, QualityTracker
+from layers.archive.parquet import ParquetArchive
 
 def loop_realtime_from_file(
     provider: FileDataProvider,
@@ -17,7 +22,17 @@ def loop_realtime_from_file(
     sunny_thr: float,
     day_thr: float,
     derate: float = 1.0,
-    alarm_manager: Optional[AlarmManager] = None
+    alarm_manager: Optional[AlarmManager] = None,
+    model: str = "pvwatts",
+    inverter_eff: float = 0.98,
+    inverter_pac_max_kw: Optional[float] = None,
+    surface: Optional[PowerSurface] = None,
+    quality: Optional[QualityConfig] = None,
+    archive: Optional[ParquetArchive] = None,
+    topology: Optional[PlantTopology] = None,
+    sun: Optional[SunTable] = None,
+    night_heartbeat_s: int = 3600,
+    night_pac_kw: float = 0.05
 ):
     current_day = None
     eac_kwh_sum = 0.0
@@ -26,10 +41,16 @@ def loop_realtime_from_file(
     cum_real_kwh = 0.0
     cum_ideal_kwh = 0.0
 
-    P0_total_kW = array_p0_kw(module_name, modules_by_inverter, n_inverters)
+    if topology is not None:
+        P0_total_kW = topology.p0_kw()
+    else:
+        P0_total_kW = array_p0_kw(module_name, modules_by_inverter, n_inverters)
     last_ts = 0
-    step_s = provider.step_minutes * 60
+    step_s = provider.step_s
     dt_h = step_s / 3600.0
+    tracker = QualityTracker(step_s, quality) if quality is not None else None
+    prev_night = False
+    last_full_ts = None
 
     while True:
         point = provider.get_point_now()
@@ -49,8 +70,54 @@ def loop_realtime_from_file(
         real_inverters = point["inverters_kw"]
         pac_kw_total = float(sum(real_inverters))
 
-        ideal_per_inv_kw = simulate(module_name, poa, tcell, modules_by_inverter, derate=derate)
-        ideal_total_kw = ideal_per_inv_kw * n_inverters
+        # potência real acima de night_pac_kw (ou POA de dia) força tick completo
+        night = (sun is not None and sun.is_night(ts_ms) and not poa > day_thr
+                 and not abs(pac_kw_total) > night_pac_kw)
+        fast = (night and prev_night and last_full_ts is not None
+                and ts_ms - last_full_ts < night_heartbeat_s * 1000)
+        prev_night = night
+
+        qa = tracker.step(point) if tracker is not None else None
+        if fast:
+            # noite: só séries que mudam (temperaturas, energia real se houver consumo)
+            emitter.emit_temps(ts_ms, tmod_c=tmod, tcell_c=tcell)
+            if pac_kw_total != 0.0:
+                cum_real_kwh += pac_kw_total * dt_h
+                emitter.emit_cumulative_energy(ts_ms, cum_real_kwh, cum_ideal_kwh)
+            if archive is not None:
+                archive.append_inverters(ts_ms, 0.0, real_inverters)
+                archive.append_plant(
+                    ts_ms, poa_wm2=poa, tcell_c=tcell, tmod_c=tmod, pac_kw_total=pac_kw_total,
+                    ideal_total_kw=0.0, pr_inst=0.0, sunny_flag=0, day_flag=0,
+                    quality_ok=qa["ok"] if qa is not None else True,
+                    real_kwh_total=cum_real_kwh, ideal_kwh_total=cum_ideal_kwh,
+                )
+            # a virada do dia fica para o próximo tick completo (eac/hpoa não mudam à noite)
+            _sleep_to_next_tick(step_s)
+            continue
+        last_full_ts = ts_ms
+
+        if qa is not None:
+            emitter.emit_quality(ts_ms, qa["flags"], qa["ok"])
+
+        if night:
+            ideal_per_inv_kw = [0.0] * topology.n_inverters if topology is not None else 0.0
+            ideal_total_kw = 0.0
+        elif topology is not None:
+            ideal_per_inv_kw = topology.simulate(
+                poa, tcell, sensors=point.get("sensors"),
+                model=model, inverter_eff=inverter_eff, inverter_pac_max_kw=inverter_pac_max_kw
+            )[0].tolist()
+            ideal_total_kw = float(sum(ideal_per_inv_kw))
+        else:
+            if surface is not None:
+                ideal_per_inv_kw = surface(poa, tcell)
+            else:
+                ideal_per_inv_kw = simulate(
+                    module_name, poa, tcell, modules_by_inverter, derate=derate,
+                    model=model, inverter_eff=inverter_eff, inverter_pac_max_kw=inverter_pac_max_kw
+                )
+            ideal_total_kw = ideal_per_inv_kw * n_inverters
 
         emitter.emit_pv_inverters(ts_ms, ideal_per_inv_kw, real_inverters)
         emitter.emit_poa([(ts_ms, poa)], source_label='source="file"')
@@ -85,10 +152,21 @@ def loop_realtime_from_file(
                 day_flag=day_flag,
                 tmod_c=tmod,
                 tcell_c=tcell,
-                inverter_kw=real_inverters
+                inverter_kw=real_inverters,
+                quality_ok=qa["sensor_ok"] if qa is not None else True,
+                inverter_ok=qa["inverter_ok"] if qa is not None else None
             )
             alarm_manager.step(obs)
 
+        if archive is not None:
+            archive.append_inverters(ts_ms, ideal_per_inv_kw, real_inverters)
+            archive.append_plant(
+                ts_ms, poa_wm2=poa, tcell_c=tcell, tmod_c=tmod, pac_kw_total=pac_kw_total,
+                ideal_total_kw=ideal_total_kw, pr_inst=pr_inst, sunny_flag=sunny_flag, day_flag=day_flag,
+                quality_ok=qa["ok"] if qa is not None else True,
+                real_kwh_total=cum_real_kwh, ideal_kwh_total=cum_ideal_kwh,
+            )
+
         dt = datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc)
         day_key = dt.strftime("%Y-%m-%d")
         if current_day is None:
@@ -102,6 +180,8 @@ def loop_realtime_from_file(
                     tzinfo=timezone.utc, hour=12, minute=0, second=0, microsecond=0
                 )
                 emitter.emit_pr_daily_bulk([(int(prev_noon.timestamp()*1000), pr_daily)])
+                if archive is not None:
+                    archive.append_pr_daily([(int(prev_noon.timestamp()*1000), pr_daily)])
             current_day = day_key
             eac_kwh_sum = 0.0
             hpoa_kwhm2_sum = 0.0
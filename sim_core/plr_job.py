@@ -0,0 +1,61 @@
+from __future__ import annotations
+import sys, time
+from datetime import datetime, timezone
+
+import config as C
+from layers.emission.sinks import make_sink
+from layers.emission.victoria import DataEmitter
+from layers.analysis.plr import PlantSpec, run_plr
+from layers.quality.checks import QualityConfig
+
+def default_plants():
+    """Frota de uma usina a partir do config principal."""
+    source = dict(
+        csv_path=C.CSV_PATH,
+        date_col=C.DATE_COL,
+        time_col=C.TIME_COL,
+        date_format=getattr(C, "DATE_FORMAT", None),
+        inverter_cols=C.INVERTER_COLS,
+        poa_col=C.POA_COL,
+        tcell_col=C.TCELL_COL,
+        tmod_col=getattr(C, "TMOD_COL", None),
+        decimal=",", sep=",",
+    )
+    return [PlantSpec(getattr(C, "PLANT_ID", "UFV_X"), source, C.MODULE_NAME, C.MODULES_BY_INVERTER, C.N_INVERTERS)]
+
+def _parse_day(s):
+    return datetime.strptime(s, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+def main(argv):
+    start = _parse_day(argv[0] if argv else getattr(C, "PLR_START", "2016-01-01"))
+    end_s = argv[1] if len(argv) > 1 else getattr(C, "PLR_END", None)
+    end = _parse_day(end_s) if end_s else datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    plants = getattr(C, "PLR_PLANTS", None)
+    plants = [PlantSpec(**p) for p in plants] if plants else default_plants()
+
+    emitter = DataEmitter(C.VM_URL, sink=make_sink(C))
+    t0 = time.perf_counter()
+    results = run_plr(
+        plants, start, end,
+        workers=getattr(C, "PLR_WORKERS", 1),
+        chunk_days=getattr(C, "PLR_CHUNK_DAYS", 90),
+        poa_min=getattr(C, "PLR_POA_MIN", 200.0),
+        ci=getattr(C, "PLR_CI", 0.95),
+        quality=QualityConfig() if getattr(C, "QUALITY_CHECKS", True) else None,
+    )
+    for r in results:
+        end_ms = r.covered_ms[1]
+        emitter.emit_performance_index_bulk(r.plant, list(zip(r.daily.day_ms.tolist(), r.daily.pi.tolist())))
+        for lr in (r.yoy, r.regression):
+            emitter.emit_loss_rate(r.plant, end_ms, lr.method, lr.rate_pct_per_year, lr.ci_low, lr.ci_high, lr.n)
+        ro = r.rolling
+        emitter.emit_loss_rate_rolling(r.plant, list(zip(ro.ts_ms.tolist(), ro.rate_pct_per_year.tolist(),
+                                                         ro.ci_low.tolist(), ro.ci_high.tolist())))
+        print(f">> {r.plant}: {r.daily.pi.size} dias ({100 * r.coverage:.0f}% da janela) | YoY {r.yoy.rate_pct_per_year:+.3f} %/ano "
+              f"[{r.yoy.ci_low:+.3f}, {r.yoy.ci_high:+.3f}] | regressão {r.regression.rate_pct_per_year:+.3f} %/ano "
+              f"[{r.regression.ci_low:+.3f}, {r.regression.ci_high:+.3f}]")
+    emitter.close()
+    print(f">> PLR: {len(plants)} usina(s), {start:%Y-%m-%d} a {end:%Y-%m-%d} em {time.perf_counter() - t0:.1f} s")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
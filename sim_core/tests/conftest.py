@@ -0,0 +1,5 @@
+import os
+import sys
+
+# os módulos do gêmeo importam "layers...", "pipelines..." a partir de sim_core/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from layers.archive.parquet import ParquetArchive
+
+T0_MS = 1_709_251_200_000   # 2024-03-01
+
+def _append(ar, start, n):
+    ts = T0_MS + (start + np.arange(n)) * 900_000
+    ar.append_plant(ts, poa_wm2=np.full(n, 500.0), pr_inst=np.full(n, 0.8), quality_ok=1)
+    ar.append_inverters(ts, np.full(n, 10.0), np.full((n, 2), 9.0))
+
+def test_archive_is_readable_while_open(tmp_path):
+    ar = ParquetArchive(str(tmp_path), "UFV_T", flush_interval_s=None)
+    _append(ar, 0, 10)
+    ar.flush()
+    assert len(ParquetArchive.read(str(tmp_path), "plant")) == 10
+    _append(ar, 10, 5)
+    # o que ainda está em buffer não aparece, mas o que já foi gravado continua válido
+    assert len(ParquetArchive.read(str(tmp_path), "plant")) == 10
+    ar.flush()
+    df = ParquetArchive.read(str(tmp_path), "inverter")
+    assert len(df) == 15 * 2
+    assert set(df["plant"]) == {"UFV_T"}
+    ar.close()
+
+def test_row_group_threshold_writes_closed_files(tmp_path):
+    ar = ParquetArchive(str(tmp_path), "UFV_T", row_group_rows=8, flush_interval_s=None)
+    _append(ar, 0, 20)   # sem flush explícito: o limiar já grava arquivos completos
+    df = ParquetArchive.read(str(tmp_path), "plant")
+    assert len(df) == 20
+    assert df["pr_inst"].iloc[0] == pytest.approx(0.8)
+
+def _files(root, table):
+    import os
+    return sorted(os.path.relpath(os.path.join(d, f), root) for d, _, fs in os.walk(os.path.join(root, table))
+                  for f in fs if f.endswith(".parquet"))
+
+def test_many_small_flushes_are_compacted_per_month(tmp_path):
+    root = str(tmp_path)
+    ar = ParquetArchive(root, "UFV_T", flush_interval_s=None)
+    for i in range(40):                 # 40 flushes de 1 passo, em março
+        _append(ar, i, 1)
+        ar.flush()
+    assert len(_files(root, "plant")) == 40
+    april = 31 * 96                     # passos de 15 min até 01/04
+    _append(ar, april, 3)
+    ar.flush()
+    # chegou abril: março fechou e virou um arquivo só
+    assert [f.split("/")[3] for f in _files(root, "plant")] == ["month=3", "month=4"]
+    _append(ar, april + 3, 2)
+    ar.flush()
+    ar.close()
+    for table in ("plant", "inverter"):
+        assert len(_files(root, table)) == 2
+    df = ParquetArchive.read(root, "plant")
+    assert len(df) == 45
+    assert df["ts"].is_monotonic_increasing
+    inv = ParquetArchive.read(root, "inverter")
+    assert len(inv) == 90 and inv["inverter"].tolist()[:4] == [0, 1, 0, 1]
@@ -0,0 +1,107 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from layers.generation.file_provider import FileDataProvider, _replay_keys
+
+CSV = """Timestamp,Time,Inv 1,Inv 2,POA,Tcell
+1/3/2024,10:00:00,1,2,"500,5",40
+1/3/2024,10:15:00,3,4,600,41
+1/3/2024,10:30:00,5,6,700,42
+2/3/2024,10:00:00,7,8,800,43
+"""
+
+def _epoch(*args):
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+@pytest.fixture
+def provider(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text(CSV)
+    return FileDataProvider(
+        csv_path=str(path), date_col="Timestamp", time_col="Time",
+        inverter_cols=["Inv 1", "Inv 2"], poa_col="POA", tcell_col="Tcell",
+    )
+
+def test_replay_keys_ignore_year_and_order_by_calendar():
+    a = _replay_keys(np.array([_epoch(2024, 3, 1, 10), _epoch(2031, 3, 1, 10)]))
+    assert a[0] == a[1]
+    ks = _replay_keys(np.array([_epoch(2024, 1, 31, 23, 59), _epoch(2024, 2, 1), _epoch(2024, 12, 31, 12)]))
+    assert np.all(np.diff(ks) > 0)
+    sod = _replay_keys(np.array([_epoch(2024, 5, 5, 0, 0, 1)])) - _replay_keys(np.array([_epoch(2024, 5, 5)]))
+    assert sod.tolist() == [1]
+
+def test_lookup_replays_any_year_and_misses_are_minus_one(provider):
+    assert provider.step_s == 900
+    hit = provider._lookup(np.array([_epoch(2024, 3, 1, 10, 15), _epoch(2029, 3, 1, 10, 15)]))
+    assert hit[0] == hit[1] >= 0
+    assert provider._poa[hit[0]] == 600.0
+    miss = provider._lookup(np.array([_epoch(2024, 3, 1, 10, 5), _epoch(2024, 3, 5, 10)]))
+    assert miss.tolist() == [-1, -1]
+
+def test_arrays_between_uses_decimal_comma_and_skips_missing(provider):
+    a = provider.get_arrays_between(datetime(2030, 3, 1, 9, 50, tzinfo=timezone.utc),
+                                    datetime(2030, 3, 2, 10, 0, tzinfo=timezone.utc))
+    assert a["poa_wm2"].tolist() == [500.5, 600.0, 700.0, 800.0]
+    assert a["inverters_kw"].tolist() == [[1, 2], [3, 4], [5, 6], [7, 8]]
+    assert a["ts_ms"][0] == _epoch(2030, 3, 1, 10) * 1000
+
+def test_resampled_gap_is_missing_row_and_backfill_energy_stays_finite(tmp_path, monkeypatch):
+    import config as C
+    import pipelines.backfill_file as bf
+    from layers.emission.sinks import MemorySink
+    from layers.emission.victoria import DataEmitter
+
+    class _Now(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2024, 3, 2, 0, 0, tzinfo=timezone.utc)
+
+    # 1 min das 08h às 16h, com 2 h sem dados (11h–13h)
+    rows = ["Timestamp,Time,Inv 1,Inv 2,POA,Tcell"]
+    for mi in range(8 * 60, 16 * 60):
+        if 11 * 60 <= mi < 13 * 60:
+            continue
+        h, m = divmod(mi, 60)
+        rows.append(f"1/3/2024,{h}:{m:02d}:00,100,100,800,45")
+    path = tmp_path / "data.csv"
+    path.write_text("\n".join(rows) + "\n")
+    p = FileDataProvider(csv_path=str(path), date_col="Timestamp", time_col="Time",
+                         inverter_cols=["Inv 1", "Inv 2"], poa_col="POA", tcell_col="Tcell",
+                         out_step_s=900)
+
+    assert p.step_s == 900
+    assert not np.isnan(p._poa).any() and not np.isnan(p._inv).any()
+    assert p._lookup(np.array([_epoch(2024, 3, 1, 12)])).tolist() == [-1]
+    assert p._lookup(np.array([_epoch(2024, 3, 1, 13)]))[0] >= 0
+
+    monkeypatch.setattr(bf, "datetime", _Now)
+    sink = MemorySink()
+    bf.run_backfill_from_file(
+        p, DataEmitter(sink=sink), module_name=C.MODULE_NAME, modules_by_inverter=100, n_inverters=2,
+        sunny_thr=400.0, day_thr=20.0, horizon_days=1,
+    )
+    energy = [float(l.split()[1]) for l in sink.metric("plant_real_energy_kwh_total")]
+    # o hold da última amostra antes do buraco (até max_gap) ainda cobre a janela das 11h
+    assert len(energy) == len(p._poa) == 25
+    assert np.isfinite(energy).all()
+    assert energy[-1] == pytest.approx(200.0 * 0.25 * 25)
+    assert all(np.isfinite(float(l.split()[1])) for l in sink.metric("model_accuracy_pct"))
+
+def test_fast_stamp_parsing_matches_dayfirst_and_reads_iso_unswapped(tmp_path):
+    path = tmp_path / "iso.csv"
+    path.write_text("Date,Time,Inv,POA,Tcell\n2024-01-02,10:00,1,2,3\n2024-01-02,10:15,1,2,3\n2024-01-13,0:00:30,1,2,3\n")
+    p = FileDataProvider(csv_path=str(path), date_col="Date", time_col="Time", inverter_cols=["Inv"],
+                         poa_col="POA", tcell_col="Tcell", decimal=".")
+    assert p._epoch_s.tolist() == [_epoch(2024, 1, 2, 10), _epoch(2024, 1, 2, 10, 15), _epoch(2024, 1, 13, 0, 0, 30)]
+
+    path = tmp_path / "dmy.csv"
+    path.write_text("Date,Time,Inv,POA,Tcell\n1/3/2024,10:00:00,1,2,3\n13/3/2024,10:00:00,1,2,3\n3/13/2024,10:00:00,1,2,3\n")
+    df = pd.read_csv(path)
+    p = FileDataProvider(csv_path=str(path), date_col="Date", time_col="Time", inverter_cols=["Inv"],
+                         poa_col="POA", tcell_col="Tcell", decimal=".")
+    old = pd.to_datetime(df["Date"] + " " + df["Time"], dayfirst=True, errors="coerce")
+    assert p._parse_stamps(df).dt.tz_localize(None).equals(old)
+    assert p._epoch_s.tolist() == [_epoch(2024, 3, 1, 10), _epoch(2024, 3, 13, 10)]
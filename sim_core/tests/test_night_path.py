@@ -0,0 +1,60 @@
+from datetime import datetime as _datetime, timezone
+
+import pytest
+
+import config as C
+import pipelines.backfill_file as bf
+from layers.generation.file_provider import FileDataProvider
+from layers.emission.sinks import MemorySink
+from layers.emission.victoria import DataEmitter
+from layers.simulation.solar_tables import SunTable
+
+class _FixedNow(_datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return _datetime(2024, 3, 2, 0, 0, tzinfo=timezone.utc)
+
+NIGHT_PAC_HOURS = (2, 3)   # inversores consumindo/gerando de madrugada
+
+@pytest.fixture
+def provider(tmp_path):
+    rows = ["Timestamp,Time,Inv 1,Inv 2,POA,Tcell"]
+    for q in range(96):
+        h, m = divmod(q * 15, 60)
+        poa = max(0.0, 1000.0 * (1 - abs(h + m / 60 - 12) / 6)) if 6 <= h < 18 else 0.0
+        pac = poa * 2.0
+        if h in NIGHT_PAC_HOURS:
+            pac = 0.5
+        rows.append(f'1/3/2024,{h}:{m:02d}:00,{pac},{pac},"{poa}",{25 + poa / 40}')
+    path = tmp_path / "data.csv"
+    path.write_text("\n".join(rows) + "\n")
+    return FileDataProvider(csv_path=str(path), date_col="Timestamp", time_col="Time",
+                            inverter_cols=["Inv 1", "Inv 2"], poa_col="POA", tcell_col="Tcell")
+
+def _run(provider, sun, monkeypatch):
+    monkeypatch.setattr(bf, "datetime", _FixedNow)
+    sink = MemorySink()
+    bf.run_backfill_from_file(
+        provider, DataEmitter(sink=sink), module_name=C.MODULE_NAME, modules_by_inverter=100, n_inverters=2,
+        sunny_thr=400.0, day_thr=20.0, horizon_days=1, sun=sun, night_heartbeat_s=3600,
+    )
+    return sink
+
+def _ts(lines):
+    return {int(l.rsplit(" ", 1)[1]) for l in lines}
+
+def test_night_fast_path_is_sparse_but_publishes_night_power(provider, tmp_path, monkeypatch):
+    full = _run(provider, None, monkeypatch)
+    sun = SunTable(-15.8, -47.9, clock_offset_h=-3, cache_dir=str(tmp_path / "cache"))
+    sparse = _run(provider, sun, monkeypatch)
+
+    assert len(sparse.metric("pv_real_kw")) < len(full.metric("pv_real_kw"))
+    assert _ts(sparse.metric("pv_cell_temp_c")) == _ts(full.metric("pv_cell_temp_c"))
+
+    night_pac = {int(_datetime(2024, 3, 1, h, m, tzinfo=timezone.utc).timestamp() * 1000)
+                 for h in NIGHT_PAC_HOURS for m in (0, 15, 30, 45)}
+    assert night_pac <= _ts(sparse.metric("pv_real_kw"))
+    assert night_pac <= _ts(sparse.metric("plant_pr_inst"))
+    # energia acumulada final é a mesma nos dois caminhos
+    last = lambda s: s.metric("plant_real_energy_kwh_total")[-1].split()[1]
+    assert last(sparse) == last(full)
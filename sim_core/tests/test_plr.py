@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+import config as C
+from layers.analysis.plr import PlantSpec, run_plr
+from layers.generation.file_provider import HistoryReader
+from layers.simulation.pv_funcs import retrieve_module_data, pvwatts_module_w
+
+RATE_PCT = -1.0
+MODULES, N_INV = 100, 2
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+@pytest.fixture(scope="module")
+def source(tmp_path_factory):
+    """3 anos horários com índice de desempenho 0.85 * (1 + RATE_PCT/100 * anos) e nuvens aleatórias."""
+    rng = np.random.default_rng(7)
+    ts = np.arange(_utc(2019, 1, 1).timestamp(), _utc(2022, 1, 1).timestamp(), 3600, dtype=np.int64)
+    hour = (ts % 86400) // 3600
+    ts = ts[(hour >= 8) & (hour <= 16)]
+    hour = (ts % 86400) // 3600
+    doy = (ts // 86400) % 365
+    clear = 1000 * np.cos((hour - 12) / 6 * np.pi / 2) * (1 - 0.1 * np.cos(2 * np.pi * doy / 365))
+    poa = clear * rng.uniform(0.5, 1.0, ts.size)
+    tcell = 20 + 10 * np.sin(2 * np.pi * doy / 365) + poa / 40
+    years = (ts - ts[0]) / (365.25 * 86400)
+    expected = MODULES * N_INV / 1000.0 * pvwatts_module_w(retrieve_module_data(C.MODULE_NAME), poa, tcell)
+    pac = expected * 0.85 * (1 + RATE_PCT / 100 * years) * rng.normal(1, 0.01, ts.size)
+    stamps = np.datetime_as_string(ts.astype("datetime64[s]"), unit="m")
+    path = tmp_path_factory.mktemp("plr") / "history.csv"
+    with open(path, "w") as fh:
+        fh.write("Stamp;Inv 1;Inv 2;POA;Tcell\n")
+        for s, p, g, t in zip(stamps, pac, poa, tcell):
+            fh.write(f"{s.replace('T', ' ')};{p / 2:.4f};{p / 2:.4f};{g:.3f};{t:.3f}\n")
+    return dict(csv_path=str(path), date_col="Stamp", time_col=None, inverter_cols=["Inv 1", "Inv 2"],
+                poa_col="POA", tcell_col="Tcell", sep=";", decimal=".", date_format="%Y-%m-%d %H:%M")
+
+def _plant(source):
+    return PlantSpec("T", source, C.MODULE_NAME, MODULES, N_INV)
+
+def test_history_reader_keeps_every_year(source):
+    r = HistoryReader(**source)
+    assert r.span[0] == _utc(2019, 1, 1, 8)
+    a = r.get_arrays_between(_utc(2019, 6, 1, 12), _utc(2021, 6, 1, 12))
+    years = a["ts_ms"].astype("datetime64[ms]").astype("datetime64[Y]").astype(int) + 1970
+    assert set(years) == {2019, 2020, 2021}
+    # sem replay: o mesmo dia/hora em anos diferentes vem de linhas diferentes
+    assert a["inverters_kw"][0, 0] != a["inverters_kw"][-1, 0]
+
+def test_known_degradation_rate_is_recovered(source):
+    (res,) = run_plr([_plant(source)], _utc(2019, 1, 1), _utc(2022, 1, 1), quality=None)
+    assert res.coverage == pytest.approx(1.0, abs=0.01)
+    assert res.daily.pi.size > 1000
+    assert res.yoy.rate_pct_per_year == pytest.approx(RATE_PCT, abs=0.05)
+    assert res.yoy.ci_low <= res.yoy.rate_pct_per_year <= res.yoy.ci_high
+    assert res.regression.rate_pct_per_year == pytest.approx(RATE_PCT, abs=0.1)
+    assert np.nanmedian(res.rolling.rate_pct_per_year) == pytest.approx(RATE_PCT, abs=0.3)
+
+def test_window_outside_history_is_rejected_and_partial_warns(source):
+    with pytest.raises(ValueError, match="não cobre"):
+        run_plr([_plant(source)], _utc(2010, 1, 1), _utc(2015, 1, 1))
+    with pytest.warns(UserWarning, match="cobre só"):
+        (res,) = run_plr([_plant(source)], _utc(2016, 1, 1), _utc(2022, 1, 1))
+    assert res.coverage == pytest.approx(0.5, abs=0.01)
+
+def test_all_methods_share_one_confidence_level(source):
+    from layers.analysis.plr import CI_LEVEL, regression_rate, rolling_rate, yoy_rate
+    (res,) = run_plr([_plant(source)], _utc(2019, 1, 1), _utc(2022, 1, 1), quality=None)
+    width = lambda lr: lr.ci_high - lr.ci_low
+    assert CI_LEVEL == 0.95
+    assert width(res.yoy) == pytest.approx(width(yoy_rate(res.daily, ci=0.95)))
+    assert width(res.regression) == pytest.approx(width(regression_rate(res.daily, ci=0.95)))
+    # IC normal: a largura escala com o quantil (1.96 vs 1.0 para 68.27 %)
+    narrow = regression_rate(res.daily, ci=0.6827)
+    assert width(res.regression) / width(narrow) == pytest.approx(1.96, rel=0.01)
+    ro, ro68 = res.rolling, rolling_rate(res.daily, ci=0.6827)
+    ok = np.isfinite(ro.rate_pct_per_year)
+    np.testing.assert_allclose((ro.ci_high - ro.ci_low)[ok] / (ro68.ci_high - ro68.ci_low)[ok], 1.96, rtol=0.01)
+    assert width(yoy_rate(res.daily, ci=0.6827)) < width(res.yoy)
+
+def test_windowed_reader_streams_only_its_year(source):
+    full = HistoryReader(**source)
+    win = HistoryReader(**source, start_utc=_utc(2020, 1, 1), end_utc=_utc(2021, 1, 1), chunk_rows=1000)
+    assert len(win.df) < len(full.df) / 2
+    assert win.span[0] == _utc(2020, 1, 1, 8) and win.span[1] == _utc(2020, 12, 31, 16)
+    a = full.get_arrays_between(_utc(2020, 1, 1), _utc(2020, 12, 31, 23))
+    b = win.get_arrays_between(_utc(2020, 1, 1), _utc(2020, 12, 31, 23))
+    np.testing.assert_array_equal(a["ts_ms"], b["ts_ms"])
+    np.testing.assert_array_equal(a["inverters_kw"], b["inverters_kw"])
+    assert HistoryReader(**source, start_utc=_utc(2010, 1, 1), end_utc=_utc(2011, 1, 1)).empty
+
+def test_per_year_files_give_the_same_rate(source, tmp_path):
+    lines = open(source["csv_path"]).read().splitlines()
+    header, rows = lines[0], lines[1:]
+    for year in (2019, 2020, 2021):
+        body = [r for r in rows if r.startswith(str(year))]
+        (tmp_path / f"hist_{year}.csv").write_text("\n".join([header] + body) + "\n")
+    split = dict(source, csv_path=str(tmp_path / "hist_{year}.csv"))
+    (a,) = run_plr([_plant(source)], _utc(2019, 1, 1), _utc(2022, 1, 1), quality=None)
+    (b,) = run_plr([_plant(split)], _utc(2019, 1, 1), _utc(2022, 1, 1), quality=None)
+    assert b.covered_ms == a.covered_ms
+    np.testing.assert_allclose(b.daily.pi, a.daily.pi)
+    assert b.yoy.rate_pct_per_year == a.yoy.rate_pct_per_year
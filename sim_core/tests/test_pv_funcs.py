@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+import config as C
+from layers.simulation.pv_funcs import (
+    cec_module_w, inverter_stage_kw, module_stc_w, pvwatts_module_w, retrieve_module_data,
+    simulate_batch, simulate_batch_parallel,
+)
+
+MODULES = 100
+
+@pytest.fixture(scope="module")
+def module():
+    return retrieve_module_data(C.MODULE_NAME)
+
+def test_cec_at_stc_matches_module_rating(module):
+    assert float(cec_module_w(module, 1000.0, 25.0)) == pytest.approx(module_stc_w(module), rel=1e-3)
+
+def test_inverter_stage_applies_efficiency_and_clipping():
+    pac = inverter_stage_kw(np.array([10.0, 100.0, -1.0]), efficiency=0.96, pac_max_kw=50.0)
+    np.testing.assert_allclose(pac, [9.6, 50.0, 0.0])
+    np.testing.assert_allclose(inverter_stage_kw(np.array([100.0]), efficiency=0.96), [96.0])
+
+def test_cec_batch_goes_through_the_inverter_stage(module):
+    poa, tcell = np.array([300.0, 1000.0]), np.array([30.0, 25.0])
+    dc_kw = MODULES * cec_module_w(module, poa, tcell) / 1000.0
+    ac = simulate_batch(C.MODULE_NAME, poa, tcell, MODULES, model="cec", inverter_eff=0.97,
+                        inverter_pac_max_kw=20.0)
+    np.testing.assert_allclose(ac, [0.97 * dc_kw[0], 20.0])
+
+def test_parallel_batch_equals_serial():
+    rng = np.random.default_rng(1)
+    poa = rng.uniform(0, 1200, 5000)
+    tcell = rng.uniform(10, 70, 5000)
+    for model in ("pvwatts", "cec"):
+        kw = dict(derate=0.9, model=model, inverter_pac_max_kw=25.0)
+        serial = simulate_batch(C.MODULE_NAME, poa, tcell, MODULES, **kw)
+        par = simulate_batch_parallel(C.MODULE_NAME, poa, tcell, MODULES, workers=2, chunk_size=1000, **kw)
+        np.testing.assert_array_equal(par, serial)
+
+def test_unknown_model_raises():
+    with pytest.raises(ValueError, match="desconhecido"):
+        simulate_batch(C.MODULE_NAME, [500.0], [25.0], MODULES, model="sapm")
+
+def test_invalid_input_is_nan_in_both_models(module):
+    poa = np.array([np.nan, 500.0, 0.0])
+    tcell = np.array([25.0, np.nan, 25.0])
+    for fn in (pvwatts_module_w, cec_module_w):
+        out = fn(module, poa, tcell)
+        assert np.isnan(out[:2]).all(), fn.__name__
+        assert out[2] == 0.0
+    for model in ("pvwatts", "cec"):
+        assert np.isnan(simulate_batch(C.MODULE_NAME, poa, tcell, MODULES, model=model)[:2]).all()
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from layers.generation.resample import resample, sample_durations
+
+def test_constant_signal_keeps_mean_and_energy():
+    ts = np.arange(0, 3600, 60)
+    r = resample(ts, np.full(ts.size, 5.0), 900)
+    assert r.ts_s.tolist() == [0, 900, 1800, 2700]
+    np.testing.assert_allclose(r.mean[:, 0], 5.0)
+    np.testing.assert_allclose(r.energy[:, 0], 5.0 * 900 / 3600)
+    np.testing.assert_allclose(r.coverage, 1.0)
+
+def test_hold_is_split_at_bin_boundary_before_gap():
+    # 1 kW a cada 1 s por 900 s, buraco de 1 h, volta por mais 900 s
+    ts = np.r_[np.arange(900), 900 + 3600 + np.arange(900)]
+    r = resample(ts, np.ones(ts.size), 900)
+    assert r.energy[0, 0] == pytest.approx(0.25)
+    assert r.energy[-1, 0] == pytest.approx(0.25)
+    # energia total = duração efetivamente segurada, sem contar duas vezes
+    held = sample_durations(ts, 900, 1).sum() / 3600.0
+    assert np.nansum(r.energy[:, 0]) == pytest.approx(held)
+
+def test_short_hole_not_double_counted():
+    ts = np.r_[np.arange(900), 1800 + np.arange(900)]
+    v = np.r_[np.full(900, 100.0), np.full(900, 200.0)]
+    r = resample(ts, v, 900)
+    assert r.energy[0, 0] == pytest.approx(25.0)
+    assert r.energy[1, 0] <= 25.0
+    assert r.energy[2, 0] == pytest.approx(50.0)
+
+def test_long_gap_is_nan_and_short_empty_bin_is_interpolated():
+    ts = np.array([0, 900, 1800, 2700, 3600 * 5])
+    r = resample(ts, np.array([1.0, 2.0, 3.0, 4.0, 9.0]), 300, max_gap_s=300)
+    # 300 s de hold por amostra: janelas 1-2, 4-5, ... ficam vazias (buraco de 600 s > max_gap)
+    assert np.isnan(r.mean[1, 0])
+    # 600 s de hold: sobra uma janela vazia entre amostras, preenchida por interpolação
+    r = resample(ts, np.array([1.0, 2.0, 3.0, 4.0, 9.0]), 300, max_gap_s=600)
+    np.testing.assert_allclose(r.mean[:9, 0], [1, 1, 1.5, 2, 2, 2.5, 3, 3, 3.5])
+
+def test_upsampling_holds_value_and_conserves_energy():
+    ts = np.arange(0, 3600, 900)
+    v = np.array([1.0, 2.0, 3.0, 4.0])
+    r = resample(ts, v, 300)
+    np.testing.assert_allclose(r.mean[:, 0], np.repeat(v, 3))
+    assert r.energy[:, 0].sum() == pytest.approx((v * 900 / 3600).sum())
+
+def test_nan_samples_do_not_count_in_mean():
+    ts = np.arange(0, 900, 60)
+    v = np.column_stack([np.full(ts.size, 2.0), np.where(ts < 450, 4.0, np.nan)])
+    r = resample(ts, v, 900)
+    np.testing.assert_allclose(r.mean[0], [2.0, 4.0])
@@ -0,0 +1,34 @@
+import gzip
+import os
+
+from layers.emission.sinks import FileSink, MemorySink
+
+DAY_MS = 86_400_000
+
+def _read(directory):
+    out = {}
+    for name in sorted(os.listdir(directory)):
+        with gzip.open(os.path.join(directory, name), "rt") as fh:
+            out[name] = fh.read().splitlines()
+    return out
+
+def test_file_sink_flushes_on_interval(tmp_path):
+    sink = FileSink(str(tmp_path), flush_interval_s=0.0)
+    sink.write("m 1 1000\n")
+    assert _read(tmp_path) == {"pv-19700101.prom.gz": ["m 1 1000"]}
+
+def test_file_sink_flushes_when_partition_closes(tmp_path):
+    sink = FileSink(str(tmp_path), flush_interval_s=None)
+    sink.write("m 1 1000\n")
+    assert _read(tmp_path) == {}
+    sink.write(f"m 2 {DAY_MS + 1000}\n")
+    files = _read(tmp_path)
+    assert files["pv-19700101.prom.gz"] == ["m 1 1000"]
+    assert files["pv-19700102.prom.gz"] == [f"m 2 {DAY_MS + 1000}"]
+    sink.close()
+
+def test_memory_sink_cap_keeps_latest_lines():
+    sink = MemorySink(max_lines=3)
+    sink.write("".join(f"m {i} {i}\n" for i in range(5)))
+    assert list(sink.lines) == ["m 2 2", "m 3 3", "m 4 4"]
+    assert sink.metric("m") == ["m 2 2", "m 3 3", "m 4 4"]
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+import config as C
+from layers.simulation.surface import PowerSurface, get_surface
+
+PAC_MAX_KW = 3000.0
+
+@pytest.fixture(scope="module", params=["pvwatts", "cec"])
+def surface(request):
+    kw = {"inverter_pac_max_kw": PAC_MAX_KW} if request.param == "cec" else {}
+    return PowerSurface(C.MODULE_NAME, C.MODULES_BY_INVERTER, derate=C.DERATE, model=request.param, **kw)
+
+def test_random_points_inside_grid_are_within_error_bound(surface):
+    assert surface.within_tol
+    rng = np.random.default_rng(11)
+    poa = rng.uniform(*surface.poa_range, 20000)
+    tcell = rng.uniform(*surface.tcell_range, 20000)
+    err = np.abs(surface.evaluate(poa, tcell) - surface._exact(poa, tcell))
+    assert err.max() <= surface.error_bound_kw <= surface.tol_kw
+
+def test_outside_grid_and_nan_use_exact_model(surface):
+    poa = np.array([1600.0, 800.0, np.nan, 800.0])
+    tcell = np.array([40.0, 95.0, 40.0, np.nan])
+    exact = surface._exact(poa, tcell)
+    np.testing.assert_array_equal(surface.evaluate(poa, tcell), exact)
+    assert surface(1600.0, 40.0) == exact[0]
+    assert surface(800.0, 95.0) == exact[1]
+    assert np.isnan(surface(float("nan"), 40.0))
+
+def test_scalar_call_equals_evaluate(surface):
+    rng = np.random.default_rng(5)
+    for poa, tcell in zip(rng.uniform(0, 1500, 200), rng.uniform(-10, 90, 200)):
+        assert surface(poa, tcell) == pytest.approx(float(surface.evaluate(poa, tcell)), abs=1e-9)
+    # bordas da grade
+    for poa, tcell in ((0.0, -10.0), (1500.0, 90.0), (1500.0, -10.0)):
+        assert surface(poa, tcell) == pytest.approx(float(surface.evaluate(poa, tcell)), abs=1e-9)
+
+def test_get_surface_reuses_instance_for_same_key():
+    a = get_surface(C.MODULE_NAME, C.MODULES_BY_INVERTER, derate=0.9, tol_kw=1.0)
+    assert get_surface(C.MODULE_NAME, C.MODULES_BY_INVERTER, derate=0.9, tol_kw=1.0) is a
+    assert get_surface(C.MODULE_NAME, C.MODULES_BY_INVERTER, derate=0.8, tol_kw=1.0) is not a
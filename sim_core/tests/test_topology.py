@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+import config as C
+from layers.simulation.topology import PlantTopology
+from layers.simulation.pv_funcs import simulate_batch
+
+def test_uniform_topology_matches_scalar_model():
+    topo = PlantTopology.uniform(C.MODULE_NAME, C.MODULES_BY_INVERTER, 3, derate=0.9)
+    poa, tcell = np.array([0.0, 400.0, 1000.0]), np.array([20.0, 35.0, 55.0])
+    kw = topo.simulate(poa, tcell)
+    assert kw.shape == (3, 3)
+    ref = simulate_batch(C.MODULE_NAME, poa, tcell, C.MODULES_BY_INVERTER, derate=0.9)
+    np.testing.assert_allclose(kw, np.repeat(ref[:, None], 3, axis=1))
+
+def test_validate_rejects_mismatched_inverter_count():
+    topo = PlantTopology.from_dicts([{"modules": 10}, {"modules": 12}], module_name=C.MODULE_NAME)
+    with pytest.raises(ValueError, match="2 inversores"):
+        topo.validate(8)
+    topo.validate(2)
+
+def test_validate_rejects_unknown_sensor():
+    topo = PlantTopology.from_dicts([{"modules": 10, "poa_sensor": "POA 2"}], module_name=C.MODULE_NAME)
+    with pytest.raises(ValueError, match="POA 2"):
+        topo.validate(1, sensor_cols=[])
+    topo.validate(1, sensor_cols=["POA 2"])